@@ -0,0 +1,75 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Apps whose reads can be served by replicas
+REPLICATED_APPS: set[str] = {"ads", "users"}
+
+_use_primary: ContextVar[bool] = ContextVar("use_primary", default=False)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Primary pinning helpers
+def is_pinned_to_primary() -> bool:
+    """
+    Check whether reads of the current request/context must go to the primary
+
+    :return: True if the replicas must be bypassed
+    """
+    return _use_primary.get()
+
+
+@contextmanager
+def use_primary():
+    """
+    Route every read inside the block to the primary database
+    Used for writes and for read-after-write requests
+    """
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Database router
+class PrimaryReplicaRouter:
+    """
+    Send reads of the ads and users apps to one of the DATABASE_REPLICAS
+    and everything else (writes, migrations, pinned reads) to the primary
+    """
+
+    primary: str = "default"
+
+    def _replicas(self) -> list[str]:
+        return [alias for alias in getattr(settings, "DATABASE_REPLICAS", []) if alias in settings.DATABASES]
+
+    def db_for_read(self, model, **hints) -> str | None:
+        if model._meta.app_label not in REPLICATED_APPS:
+            return None
+
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db == self.primary:
+            return self.primary
+
+        replicas: list[str] = self._replicas()
+        if not replicas or is_pinned_to_primary():
+            return self.primary
+
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints) -> str:
+        return self.primary
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool | None:
+        databases: set[str] = {self.primary, *self._replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> bool:
+        return db == self.primary
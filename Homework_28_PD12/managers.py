@@ -0,0 +1,18 @@
+from django.db import models
+from django.db.models import QuerySet
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Soft delete
+class SoftDeleteManager(models.Manager):
+    """
+    Hide tombstoned rows (is_deleted=True)
+
+    Only the column of the model itself is checked, so the queries don't join the related tables:
+    the rows of a tombstoned parent (the ads of a user or a category) are tombstoned in the transaction
+    of the parent (see ads/purge.py), and all the rows are removed later in batches by the purge command
+    (manage.py purge_deleted)
+    """
+
+    def get_queryset(self) -> QuerySet:
+        return super().get_queryset().filter(is_deleted=False)
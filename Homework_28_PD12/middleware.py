@@ -0,0 +1,205 @@
+import gzip
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from Homework_28_PD12.db_router import use_primary
+from Homework_28_PD12.ratelimit import retry_later
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+SAFE_METHODS: set[str] = {"GET", "HEAD", "OPTIONS"}
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Read replica pinning
+class ReplicaPinningMiddleware:
+    """
+    Pin writes and read-after-write requests to the primary database
+
+    A write marks the client with a short-lived cookie, so its next reads
+    see its own changes instead of a lagging replica. The cookie holds the end of the pin:
+    a client that keeps it past REPLICA_PIN_SECONDS is served by the replicas again
+    """
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+
+    @staticmethod
+    def is_pinned(request: HttpRequest) -> bool:
+        try:
+            return float(request.COOKIES[settings.REPLICA_PIN_COOKIE]) > time.time()
+        except (KeyError, ValueError):
+            return False
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        is_write: bool = request.method not in SAFE_METHODS
+
+        if not is_write and not self.is_pinned(request):
+            return self.get_response(request)
+
+        with use_primary():
+            response: HttpResponse = self.get_response(request)
+
+        if is_write:
+            pinned_until: float = time.time() + settings.REPLICA_PIN_SECONDS
+            response.set_cookie(settings.REPLICA_PIN_COOKIE, f"{pinned_until:.3f}",
+                                max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite="Lax")
+
+        return response
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Admission control
+class WriteConcurrencyLimitMiddleware:
+    """
+    Cap the number of write requests handled at the same time by the process
+
+    A write waits at most WRITE_ADMISSION_TIMEOUT seconds for a free slot and is rejected
+    with 503 and Retry-After instead of queueing forever, so reads keep their worker threads
+    and database connections during a write flood
+    """
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        self.slots = threading.BoundedSemaphore(settings.MAX_CONCURRENT_WRITES)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if request.method in SAFE_METHODS:
+            return self.get_response(request)
+
+        if not self.slots.acquire(timeout=settings.WRITE_ADMISSION_TIMEOUT):
+            return retry_later(settings.WRITE_ADMISSION_RETRY_AFTER, status=503, error="Server is busy")
+
+        try:
+            return self.get_response(request)
+        finally:
+            self.slots.release()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Response compression
+def _gzip(content: bytes, level: int) -> bytes:
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+def _brotli(content: bytes, level: int) -> bytes:
+    return brotli.compress(content, quality=level)
+
+
+def _zstd(content: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(content)
+
+
+# Supported encodings in the order of preference
+COMPRESSORS: dict = {
+    encoding: compressor for encoding, compressor, available in [
+        ("br", _brotli, brotli is not None),
+        ("zstd", _zstd, zstandard is not None),
+        ("gzip", _gzip, True),
+    ] if available
+}
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """
+    Parse an Accept-Encoding header
+
+    :param header: Header value, e.g. "gzip, br;q=0.8"
+    :return: Dictionary encoding -> quality
+    """
+    encodings: dict[str, float] = {}
+
+    for item in header.split(","):
+        encoding, _, params = item.strip().partition(";")
+        if not encoding:
+            continue
+
+        quality: float = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+
+        encodings[encoding.strip().lower()] = quality
+
+    return encodings
+
+
+def choose_encoding(header: str) -> str | None:
+    """
+    Pick the best supported encoding accepted by the client
+
+    :param header: Accept-Encoding header value
+    :return: Encoding name or None if nothing acceptable is supported
+    """
+    accepted: dict[str, float] = parse_accept_encoding(header)
+    wildcard: float = accepted.get("*", 0.0)
+
+    candidates: list[tuple[float, int, str]] = []
+    for preference, encoding in enumerate(COMPRESSORS):
+        quality: float = accepted.get(encoding, wildcard)
+        if quality > 0:
+            candidates.append((quality, -preference, encoding))
+
+    return max(candidates)[2] if candidates else None
+
+
+class CompressionMiddleware:
+    """
+    Compress JSON and text responses with brotli, zstd or gzip
+    depending on the Accept-Encoding header of the client
+
+    brotli and zstd are used only when the brotli/zstandard packages are installed,
+    bodies shorter than COMPRESSION_MIN_SIZE are sent as is
+    """
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        response: HttpResponse = self.get_response(request)
+
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+
+        content_type: str = response.get("Content-Type", "").split(";")[0]
+        if content_type not in settings.COMPRESSION_CONTENT_TYPES:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        encoding: str | None = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        compressed: bytes = COMPRESSORS[encoding](response.content, settings.COMPRESSION_LEVELS[encoding])
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(compressed))
+        response.headers["Content-Encoding"] = encoding
+
+        # The compressed body is not byte-identical to the uncompressed one
+        etag: str | None = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+
+        return response
@@ -0,0 +1,42 @@
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Paginator for big tables
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that takes the number of rows from the planner estimate on PostgreSQL
+    instead of running COUNT(*) over big tables
+
+    The exact count is used on other databases and when the estimate is below ESTIMATED_COUNT_THRESHOLD
+    """
+
+    @cached_property
+    def count(self) -> int:
+        estimate: int | None = self.estimate_count()
+        if estimate is not None and estimate >= settings.ESTIMATED_COUNT_THRESHOLD:
+            return estimate
+        return super().count
+
+    def estimate_count(self) -> int | None:
+        if not isinstance(self.object_list, QuerySet):
+            return None
+
+        connection = connections[self.object_list.db]
+        if connection.vendor != "postgresql":
+            return None
+
+        sql, params = self.object_list.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,90 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from django.db.models import QuerySet
+from django.http import HttpRequest
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Projection of API fields on model columns
+@dataclass(frozen=True)
+class ApiField:
+    """
+    Describe what an output field of the API needs from the database
+
+    only: model columns loaded with .only()
+    select_related: joins needed by the field
+    prefetch_related: prefetches needed by the field
+    annotate: annotations (name -> expression) needed by the field
+    getter: function building the output value from a model instance
+    """
+    getter: Callable[[Any], Any]
+    only: tuple[str, ...] = ()
+    select_related: tuple[str, ...] = ()
+    prefetch_related: tuple[str, ...] = ()
+    annotate: dict = field(default_factory=dict)
+
+
+def get_requested_fields(request: HttpRequest, api_fields: dict[str, ApiField], default: list[str]) -> list[str]:
+    """
+    Parse the ?fields= query parameter
+
+    :param request: The incoming request object
+    :param api_fields: Fields the view can return
+    :param default: Fields returned when the parameter is absent
+    :return: Requested field names in the requested order
+    :raises ValueError: If an unknown field is requested
+    """
+    raw_fields: str = request.GET.get("fields", "")
+    if not raw_fields:
+        return default
+
+    fields: list[str] = list(dict.fromkeys(name.strip() for name in raw_fields.split(",") if name.strip()))
+    unknown: list[str] = [name for name in fields if name not in api_fields]
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    return fields
+
+
+def project_queryset(queryset: QuerySet, api_fields: dict[str, ApiField], fields: list[str]) -> QuerySet:
+    """
+    Load only the columns, joins, prefetches and annotations the requested fields need
+
+    :param queryset: Base queryset
+    :param api_fields: Fields the view can return
+    :param fields: Requested field names
+    :return: Projected queryset
+    """
+    only: list[str] = ["pk"]
+    select_related: list[str] = []
+    prefetch_related: list[str] = []
+    annotate: dict = {}
+
+    for name in fields:
+        api_field: ApiField = api_fields[name]
+        only.extend(api_field.only)
+        select_related.extend(api_field.select_related)
+        prefetch_related.extend(api_field.prefetch_related)
+        annotate.update(api_field.annotate)
+
+    if select_related:
+        queryset = queryset.select_related(*dict.fromkeys(select_related))
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*dict.fromkeys(prefetch_related))
+    if annotate:
+        queryset = queryset.annotate(**annotate)
+
+    return queryset.only(*dict.fromkeys(only))
+
+
+def serialize(obj: Any, api_fields: dict[str, ApiField], fields: list[str]) -> dict:
+    """
+    Build the response dictionary of a single object
+
+    :param obj: Model instance loaded with project_queryset()
+    :param api_fields: Fields the view can return
+    :param fields: Requested field names
+    :return: Dictionary with the requested fields
+    """
+    return {name: api_fields[name].getter(obj) for name in fields}
@@ -0,0 +1,156 @@
+import json
+import os
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import QuerySet
+from django.test import RequestFactory
+
+# Plan nodes that sort the rows: they appear when an ORDER BY can't be served by an index
+SORT_NODES: set[str] = {"Sort", "Incremental Sort", "USE TEMP B-TREE FOR ORDER BY"}
+
+# Estimated rows of a node may drift this many times from the baseline before a warning
+ROWS_FACTOR: int = 10
+
+SQLITE_NODE = re.compile(r"^(?P<node>SCAN|SEARCH) (?:TABLE )?(?P<relation>\S+)(?: AS \S+)?"
+                         r"(?: USING (?:COVERING )?INDEX (?P<index>\S+)| USING (?P<pk>INTEGER PRIMARY KEY))?")
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Hot querysets
+def _view_queryset(view_class, fields: list[str] | None = None) -> QuerySet:
+    view = view_class()
+    view.setup(RequestFactory().get("/"))
+    if fields is not None:
+        view.requested_fields = fields
+    return view.get_queryset()
+
+
+def hot_querysets() -> dict[str, QuerySet]:
+    """
+    Querysets the list and detail views run on every request, with the default ?fields=
+
+    :return: Dictionary query name -> queryset
+    """
+    from ads.views import AD_DEFAULT_FIELDS, AdDetailView, AdListView, CategoryListView
+    from users.serializers import USER_DEFAULT_FIELDS
+    from users.views import UserDetailView, UserListView
+
+    page: int = settings.TOTAL_ON_PAGE
+
+    return {
+        "ads.list": _view_queryset(AdListView, AD_DEFAULT_FIELDS)[:page],
+        "ads.detail": _view_queryset(AdDetailView, AD_DEFAULT_FIELDS).filter(pk=1),
+        "categories.list": _view_queryset(CategoryListView).order_by("name"),
+        "users.list": _view_queryset(UserListView, USER_DEFAULT_FIELDS + ["total_ads"])[:page],
+        "users.detail": _view_queryset(UserDetailView, USER_DEFAULT_FIELDS).filter(pk=1),
+    }
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Plans
+def _postgresql_nodes(plan: dict) -> list[dict]:
+    nodes: list[dict] = [{
+        "node": plan["Node Type"],
+        "relation": plan.get("Relation Name"),
+        "index": plan.get("Index Name"),
+        "rows": plan.get("Plan Rows"),
+    }]
+    for child in plan.get("Plans", []):
+        nodes += _postgresql_nodes(child)
+    return nodes
+
+
+def _sqlite_node(detail: str) -> dict:
+    match = SQLITE_NODE.match(detail)
+    if match is None:
+        return {"node": detail, "relation": None, "index": None, "rows": None}
+    return {
+        "node": match["node"],
+        "relation": match["relation"],
+        "index": match["index"] or ("PRIMARY KEY" if match["pk"] else None),
+        "rows": None,
+    }
+
+
+def explain(queryset: QuerySet) -> list[dict]:
+    """
+    Get the plan of a queryset as a flat list of nodes
+
+    EXPLAIN (FORMAT JSON) on PostgreSQL, EXPLAIN QUERY PLAN on SQLite (no row estimates)
+
+    :param queryset: Queryset to explain
+    :return: Nodes with the node type, the table, the index and the estimated rows
+    :raises ValueError: If the database is neither PostgreSQL nor SQLite
+    """
+    connection = connections[queryset.db]
+    if connection.vendor not in ("postgresql", "sqlite"):
+        raise ValueError(f"Query plans are not supported on {connection.vendor}")
+
+    sql, params = queryset.query.sql_with_params()
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return _postgresql_nodes(plan[0]["Plan"])
+
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [_sqlite_node(row[-1]) for row in cursor.fetchall()]
+
+
+def compare(baseline: list[dict], current: list[dict]) -> tuple[list[str], list[str]]:
+    """
+    Compare a plan with its baseline
+
+    An index of the baseline missing from the plan or a new sort node is a regression,
+    a big change of the estimated rows is only a warning
+
+    :return: Regressions and warnings
+    """
+    regressions: list[str] = []
+    warnings: list[str] = []
+
+    used: set[tuple] = {(node["relation"], node["index"]) for node in current}
+    for node in baseline:
+        if node["index"] and (node["relation"], node["index"]) not in used:
+            scans: list[str] = [other["node"] for other in current if other["relation"] == node["relation"]]
+            regressions.append(f"{node['relation']} doesn't use {node['index']} any more "
+                               f"({', '.join(scans) or 'not scanned'})")
+
+    if not any(node["node"] in SORT_NODES for node in baseline):
+        regressions += [f"new {node['node']} node" for node in current if node["node"] in SORT_NODES]
+
+    baseline_rows: dict[tuple, int] = {(node["node"], node["relation"]): node["rows"] for node in baseline
+                                       if node["rows"]}
+    for node in current:
+        rows: int | None = baseline_rows.get((node["node"], node["relation"]))
+        if rows and node["rows"] and not rows / ROWS_FACTOR <= node["rows"] <= rows * ROWS_FACTOR:
+            warnings.append(f"{node['node']} {node['relation'] or ''} estimates {node['rows']} rows "
+                            f"instead of {rows}")
+
+    return regressions, warnings
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Baselines
+def baseline_path(vendor: str) -> str:
+    return os.path.join(settings.QUERY_PLAN_BASELINES_DIR, f"{vendor}.json")
+
+
+def load_baselines(vendor: str) -> dict[str, list[dict]]:
+    try:
+        with open(baseline_path(vendor), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baselines(vendor: str, plans: dict[str, list[dict]]) -> None:
+    os.makedirs(settings.QUERY_PLAN_BASELINES_DIR, exist_ok=True)
+    with open(baseline_path(vendor), "w", encoding="utf-8") as f:
+        json.dump(plans, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
@@ -0,0 +1,169 @@
+import math
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpRequest, JsonResponse
+
+RATE_PERIODS: dict[str, int] = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Buckets idle for longer than the longest period are full again and can be forgotten
+MAX_IDLE: int = RATE_PERIODS["d"]
+MAX_BUCKETS: int = 100_000
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Token bucket
+def parse_rate(rate: str) -> tuple[float, float]:
+    """
+    Parse a rate like "10/m" or "5/s"
+
+    :param rate: Number of requests per period (s, m, h or d)
+    :return: Bucket capacity and refill speed (tokens per second)
+    """
+    count, _, period = rate.partition("/")
+    capacity: float = float(count)
+    return capacity, capacity / RATE_PERIODS[period.strip()[0]]
+
+
+def refill(tokens: float, updated_at: float, now: float, capacity: float, speed: float) -> float:
+    return min(capacity, tokens + (now - updated_at) * speed)
+
+
+def take(tokens: float, speed: float) -> tuple[float, bool, float]:
+    """
+    Take a token from the bucket
+
+    :return: Tokens left, whether the request is allowed and seconds until the next token
+    """
+    if tokens >= 1:
+        return tokens - 1, True, 0.0
+    return tokens, False, (1 - tokens) / speed
+
+
+class InMemoryBackend:
+    """
+    Buckets of the current process
+    """
+
+    def __init__(self) -> None:
+        self.buckets: dict[str, tuple[float, float]] = {}
+        self.lock = threading.Lock()
+
+    def consume(self, key: str, capacity: float, speed: float) -> tuple[bool, float]:
+        now: float = time.monotonic()
+        with self.lock:
+            tokens, updated_at = self.buckets.get(key, (capacity, now))
+            tokens, allowed, retry_after = take(refill(tokens, updated_at, now, capacity, speed), speed)
+            self.buckets[key] = (tokens, now)
+
+            if len(self.buckets) > MAX_BUCKETS:
+                self.buckets = {key: bucket for key, bucket in self.buckets.items() if now - bucket[1] < MAX_IDLE}
+        return allowed, retry_after
+
+
+class SQLiteBackend:
+    """
+    Buckets in an SQLite file shared by all worker processes of the host
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.local = threading.local()
+
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS buckets "
+                               "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)")
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if not hasattr(self.local, "connection"):
+            self.local.connection = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+        return self.local.connection
+
+    def consume(self, key: str, capacity: float, speed: float) -> tuple[bool, float]:
+        now: float = time.time()
+        connection: sqlite3.Connection = self.connection
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated_at = row if row else (capacity, now)
+            tokens, allowed, retry_after = take(refill(tokens, updated_at, now, capacity, speed), speed)
+            connection.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                               (key, tokens, now))
+            if not row:
+                connection.execute("DELETE FROM buckets WHERE updated_at < ?", (now - MAX_IDLE,))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        return allowed, retry_after
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> InMemoryBackend | SQLiteBackend:
+    """
+    Get the rate limit backend configured by RATELIMIT_BACKEND ("memory" or "sqlite")
+    """
+    global _backend
+
+    with _backend_lock:
+        if _backend is None:
+            if settings.RATELIMIT_BACKEND == "sqlite":
+                _backend = SQLiteBackend(settings.RATELIMIT_SQLITE_PATH)
+            else:
+                _backend = InMemoryBackend()
+    return _backend
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# View decorator
+def get_client_ip(request: HttpRequest) -> str:
+    if settings.RATELIMIT_TRUST_FORWARDED_FOR and "HTTP_X_FORWARDED_FOR" in request.META:
+        return request.META["HTTP_X_FORWARDED_FOR"].split(",")[0].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def retry_later(retry_after: float, status: int = 429, error: str = "Too many requests") -> JsonResponse:
+    """
+    Build a rejection response telling the client when to retry
+
+    :param retry_after: Seconds until the request can succeed
+    :param status: 429 for a client over its limit, 503 for an overloaded server
+    :param error: Error message
+    :return: JSON response with the Retry-After header
+    """
+    response = JsonResponse({"error": error}, status=status)
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def ratelimit(group: str):
+    """
+    Limit the requests of every client to the view by a token bucket
+
+    :param group: Endpoint name, its rate is taken from RATELIMIT_RATES
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs):
+            if not settings.RATELIMIT_ENABLED:
+                return view(request, *args, **kwargs)
+
+            capacity, speed = parse_rate(settings.RATELIMIT_RATES[group])
+            allowed, retry_after = get_backend().consume(f"{group}:{get_client_ip(request)}", capacity, speed)
+            if not allowed:
+                return retry_later(retry_after)
+
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -13,8 +13,6 @@ import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
-from django.template.context_processors import media
-
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
@@ -41,16 +39,21 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'ads',
     'users',
+    'changes',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'Homework_28_PD12.middleware.CompressionMiddleware',
+    'Homework_28_PD12.middleware.WriteConcurrencyLimitMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'Homework_28_PD12.middleware.ReplicaPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'Homework_28_PD12.urls'
@@ -86,10 +89,73 @@ DATABASES = {
         'PASSWORD': 'postgres',
         'HOST': 'localhost',
         'PORT': '5432'
-    }
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': 'postgres',
+        'USER': 'postgres',
+        'PASSWORD': 'postgres',
+        'HOST': os.environ.get('DB_REPLICA_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_REPLICA_PORT', '5432'),
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+# Read replicas for the ads and users apps (see Homework_28_PD12/db_router.py)
+
+DATABASE_ROUTERS = ['Homework_28_PD12.db_router.PrimaryReplicaRouter']
+
+DATABASE_REPLICAS = ['replica']
+
+# Reads of a client stay on the primary for this long after its last write
+
+REPLICA_PIN_COOKIE = 'use_primary'
+
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# "default" is shared by all worker processes: it keeps the data versions used for ETags
+# "local" is a per-process cache for short-lived data (verified passwords)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
 }
 
 
+# Password hashing (see users/passwords.py)
+# https://docs.djangoproject.com/en/4.1/topics/auth/passwords/
+
+PASSWORD_HASHERS = [
+    'users.passwords.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+PASSWORD_PBKDF2_ITERATIONS = 390000
+
+PASSWORD_HASHING_WORKERS = 2
+
+PASSWORD_HASHING_TIMEOUT = 10
+
+PASSWORD_HASHING_RETRY_AFTER = 1
+
+PASSWORD_VERIFIED_CACHE = 'local'
+
+PASSWORD_VERIFIED_CACHE_TTL = 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -133,6 +199,109 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 TOTAL_ON_PAGE = 10
 
+# Facets of the ads list (?facets=category,price_buckets)
+
+AD_PRICE_BUCKET_WIDTH = 1000
+
+AD_FACETS_CACHE_TTL = 30
+
+# Hot snapshot of the first ads pages and the categories list (see ads/snapshot.py)
+# Rebuilt by manage.py build_snapshot --loop, served for at most AD_SNAPSHOT_MAX_STALENESS seconds after a change
+
+AD_SNAPSHOT_ENABLED = False
+
+AD_SNAPSHOT_PATH = os.path.join(BASE_DIR, 'var', 'snapshot', 'hot.bin')
+
+AD_SNAPSHOT_PAGES = 5
+
+AD_SNAPSHOT_MAX_STALENESS = 10
+
+# Admin changelists take the planner estimate instead of COUNT(*) above this number of rows
+
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+# Baselines of manage.py check_query_plans, one file per database vendor
+
+QUERY_PLAN_BASELINES_DIR = os.path.join(BASE_DIR, 'query_plans')
+
 MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Response compression (see Homework_28_PD12/middleware.py)
+
+COMPRESSION_MIN_SIZE = 1024
+
+COMPRESSION_CONTENT_TYPES = ['application/json', 'text/html', 'text/plain']
+
+COMPRESSION_LEVELS = {'br': 5, 'zstd': 3, 'gzip': 6}
+
+# Rate limiting of the write endpoints (see Homework_28_PD12/ratelimit.py)
+# RATELIMIT_BACKEND: "memory" (per process) or "sqlite" (shared by the processes of the host)
+
+RATELIMIT_ENABLED = True
+
+RATELIMIT_BACKEND = 'memory'
+
+RATELIMIT_SQLITE_PATH = os.path.join(BASE_DIR, 'ratelimit.sqlite3')
+
+RATELIMIT_TRUST_FORWARDED_FOR = False
+
+RATELIMIT_RATES = {
+    'ad_create': '30/m',
+    'ad_upload_image': '10/m',
+    'user_create': '10/m',
+    'user_login': '20/m',
+}
+
+# Admission control: concurrent writes per process and how long a write may wait for a slot
+
+MAX_CONCURRENT_WRITES = 4
+
+WRITE_ADMISSION_TIMEOUT = 2
+
+WRITE_ADMISSION_RETRY_AFTER = 1
+
+# Change feed (/changes/): batch size and long poll limits
+
+CHANGES_BATCH_SIZE = 500
+
+CHANGES_MAX_WAIT = 25
+
+CHANGES_POLL_INTERVAL = 0.5
+
+# Background jobs (see jobs/queue.py, run the workers with manage.py run_workers)
+# JOBS_EAGER runs the jobs inside the request instead of queueing them
+
+JOBS_EAGER = False
+
+JOBS_WORKER_PROCESSES = 1
+
+JOBS_WORKER_THREADS = 2
+
+JOBS_POLL_INTERVAL = 1
+
+JOBS_MAX_ATTEMPTS = 5
+
+JOBS_RETRY_BACKOFF = 5
+
+JOBS_RETRY_BACKOFF_MAX = 600
+
+JOBS_TIMEOUT = 3600
+
+# Uploads waiting for the ads.store_image job
+
+UPLOAD_STAGING_DIR = os.path.join(BASE_DIR, 'var', 'uploads')
+
+# Limits of the ad image upload (see ads/uploads.py)
+# The endpoint streams images to disk, FILE_UPLOAD_MAX_MEMORY_SIZE doesn't apply to it
+
+AD_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+
+# Room for the multipart boundaries and headers in the request Content-Length
+
+AD_IMAGE_FORM_OVERHEAD = 64 * 1024
+
+AD_IMAGE_MAX_PIXELS = 40_000_000
+
+AD_IMAGE_FORMATS = ['JPEG', 'PNG', 'WEBP', 'GIF']
@@ -0,0 +1,33 @@
+"""
+API-only settings for Homework_28_PD12 project.
+
+The JSON API does not use the admin, sessions, messages, static files or templates,
+so workers and management commands started with this profile don't load them:
+
+    DJANGO_SETTINGS_MODULE=Homework_28_PD12.settings_api gunicorn Homework_28_PD12.wsgi
+"""
+from Homework_28_PD12.settings import *  # noqa: F401,F403
+from Homework_28_PD12.settings import INSTALLED_APPS, MIDDLEWARE
+
+UI_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+]
+
+UI_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in UI_APPS]
+
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in UI_MIDDLEWARE]
+
+TEMPLATES = []
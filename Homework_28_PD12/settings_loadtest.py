@@ -0,0 +1,41 @@
+"""
+Load test settings for Homework_28_PD12 project.
+
+The API-only profile on a local SQLite file instead of PostgreSQL, with rate limiting off
+and jobs run inline, so a single machine can measure the throughput of the endpoints:
+
+    export DJANGO_SETTINGS_MODULE=Homework_28_PD12.settings_loadtest
+    python -m benchmarks.loadtest prepare --users 1000 --ads 10000
+    gunicorn Homework_28_PD12.wsgi -w 4
+    python -m benchmarks.loadtest run --url http://127.0.0.1:8000
+
+To test against a local PostgreSQL use settings_api with RATELIMIT_ENABLED switched off instead
+"""
+import os
+
+from Homework_28_PD12.settings_api import *  # noqa: F401,F403
+from Homework_28_PD12.settings_api import BASE_DIR
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['*']
+
+LOADTEST_DATABASE = os.environ.get('LOADTEST_DATABASE', os.path.join(BASE_DIR, 'loadtest.sqlite3'))
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': LOADTEST_DATABASE,
+        'OPTIONS': {
+            'timeout': 20,
+        },
+    },
+}
+
+DATABASE_ROUTERS = []
+
+DATABASE_REPLICAS = []
+
+RATELIMIT_ENABLED = False
+
+JOBS_EAGER = True
@@ -0,0 +1,55 @@
+"""
+Test settings for Homework_28_PD12 project.
+
+A default+replica pair of SQLite databases (the replica mirrors the default one), local memory caches,
+jobs run inline and cheap password hashing, so the suite runs without PostgreSQL:
+
+    python manage.py test --settings=Homework_28_PD12.settings_test
+
+TestCase keeps the data of a test in an uncommitted transaction of the default connection, so the replica
+is off by default: the routing tests switch DATABASE_REPLICAS on and query it from a TransactionTestCase
+"""
+import os
+import tempfile
+
+from Homework_28_PD12.settings import *  # noqa: F401,F403
+from Homework_28_PD12.settings import BASE_DIR
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'test.sqlite3'),
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'test.sqlite3'),
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+DATABASE_REPLICAS = []
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'default',
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'local',
+    },
+}
+
+PASSWORD_PBKDF2_ITERATIONS = 1000
+
+RATELIMIT_ENABLED = False
+
+JOBS_EAGER = True
+
+MEDIA_ROOT = os.path.join(tempfile.gettempdir(), 'homework_28_pd12_test', 'media')
+
+UPLOAD_STAGING_DIR = os.path.join(tempfile.gettempdir(), 'homework_28_pd12_test', 'uploads')
+
+AD_SNAPSHOT_PATH = os.path.join(tempfile.gettempdir(), 'homework_28_pd12_test', 'snapshot', 'hot.bin')
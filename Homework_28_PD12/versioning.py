@@ -0,0 +1,123 @@
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest
+
+from Homework_28_PD12.db_router import is_pinned_to_primary
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Data versions
+# Every data set ("ads", "categories", "users") has a random version token in the shared cache
+# Model signals replace the token on every change, so a version identifies the state of the data
+# without touching the rows themselves
+#
+# QuerySet.update(), bulk_create(), raw SQL and cascades done by the database send no signals:
+# code changing rows that way must call bump_version() itself (see ads/purge.py, ads/stats.py, import_csv.py),
+# otherwise the ETags and the cached facets stay valid for data that has changed
+VERSION_KEY: str = "data-version:{}"
+
+
+def _new_version() -> str:
+    return f"{uuid.uuid4().hex}:{time.time()}"
+
+
+def get_versions(*names: str) -> dict[str, str]:
+    """
+    Get the current version tokens of the data sets
+
+    :param names: Data set names
+    :return: Dictionary data set name -> version token
+    """
+    keys: dict[str, str] = {VERSION_KEY.format(name): name for name in names}
+    versions: dict[str, str] = cache.get_many(keys)
+
+    missing: dict[str, str] = {key: _new_version() for key in keys if key not in versions}
+    if missing:
+        for key, version in missing.items():
+            cache.add(key, version, timeout=None)
+        versions.update(cache.get_many(missing))
+
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def bump_version(*names: str) -> None:
+    """
+    Mark the data sets as changed
+
+    :param names: Data set names
+    """
+    cache.set_many({VERSION_KEY.format(name): _new_version() for name in names}, timeout=None)
+
+
+def last_changed_at(versions: dict[str, str]) -> float:
+    """
+    Get the time of the latest change of the data sets
+
+    :param versions: Dictionary data set name -> version token
+    :return: Unix time
+    """
+    return max(float(version.rsplit(":", 1)[1]) for version in versions.values())
+
+
+def is_settled(versions: dict[str, str]) -> bool:
+    """
+    Check whether a response built from the data sets may be cached under their versions
+
+    Right after a change the replicas may still lag behind the primary, and a stale replica response
+    would be cached under the new version. Reads pinned to the primary are always up to date
+
+    :param versions: Dictionary data set name -> version token
+    :return: True if the data read now matches the versions
+    """
+    return is_pinned_to_primary() or time.time() - last_changed_at(versions) >= settings.REPLICA_PIN_SECONDS
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# ETags
+def data_etag(request: HttpRequest, *names: str) -> str | None:
+    """
+    Build an ETag from the request URL and the versions of the data sets the response is built from
+
+    No ETag is returned right after a change while replicas may still lag behind the primary,
+    otherwise a stale replica response could be cached by clients under the new version
+
+    :param request: The incoming request object
+    :param names: Data set names the response depends on
+    :return: ETag value or None
+    """
+    versions: dict[str, str] = get_versions(*names)
+    if not is_settled(versions):
+        return None
+
+    return versions_etag(request.get_full_path(), versions)
+
+
+def versions_etag(path: str, versions: dict[str, str]) -> str:
+    """
+    Build an ETag of a response from its URL and the data versions it was built from
+
+    :param path: Full path of the request
+    :param versions: Dictionary data set name -> version token
+    :return: ETag value
+    """
+    key: str = "|".join([path, *(versions[name] for name in sorted(versions))])
+    return hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+
+
+def ads_etag(request: HttpRequest, *args, **kwargs) -> str | None:
+    return data_etag(request, "ads", "categories", "users")
+
+
+def categories_etag(request: HttpRequest, *args, **kwargs) -> str | None:
+    return data_etag(request, "categories")
+
+
+def category_stats_etag(request: HttpRequest, *args, **kwargs) -> str | None:
+    return data_etag(request, "categories", "ads")
+
+
+def users_etag(request: HttpRequest, *args, **kwargs) -> str | None:
+    return data_etag(request, "users", "ads")
@@ -1,8 +1,27 @@
 from django.contrib import admin
 
+from Homework_28_PD12.paginator import EstimatedCountPaginator
 from ads.models import Ad, Category
 
+
 # ----------------------------------------------------------------------------------------------------------------------
 # Register models
-admin.site.register(Ad)
-admin.site.register(Category)
+@admin.register(Ad)
+class AdAdmin(admin.ModelAdmin):
+    list_display: tuple[str, ...] = ("id", "name", "author", "category", "price", "is_published")
+    list_select_related: tuple[str, ...] = ("author", "category")
+    list_filter: tuple[str, ...] = ("is_published",)
+    search_fields: tuple[str, ...] = ("name",)
+    autocomplete_fields: tuple[str, ...] = ("author", "category")
+    list_per_page: int = 50
+    show_full_result_count: bool = False
+    paginator = EstimatedCountPaginator
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display: tuple[str, ...] = ("id", "name")
+    search_fields: tuple[str, ...] = ("name",)
+    list_per_page: int = 50
+    show_full_result_count: bool = False
+    paginator = EstimatedCountPaginator
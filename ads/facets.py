@@ -0,0 +1,109 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, IntegerField, QuerySet
+from django.db.models.functions import Cast
+from django.http import HttpRequest
+from django.utils.http import urlencode
+
+from Homework_28_PD12.versioning import get_versions, is_settled
+
+FACETS: tuple[str, ...] = ("category", "price_buckets")
+
+FACETS_KEY: str = "ad-facets:{}"
+
+# Query parameters that don't change the rows of the list, left out of the cache key of the facets
+FACETS_IGNORED_PARAMS: tuple[str, ...] = ("page", "fields", "facets")
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Facets of the advertisements list
+def get_requested_facets(request: HttpRequest) -> list[str]:
+    """
+    Parse the ?facets= query parameter
+
+    :param request: The incoming request object
+    :return: Requested facet names, empty if the parameter is absent
+    :raises ValueError: If an unknown facet is requested
+    """
+    facets: list[str] = list(dict.fromkeys(name.strip() for name in request.GET.get("facets", "").split(",")
+                                           if name.strip()))
+    unknown: list[str] = [name for name in facets if name not in FACETS]
+    if unknown:
+        raise ValueError(f"Unknown facets: {', '.join(unknown)}")
+
+    return facets
+
+
+def get_facets_cache_key(request: HttpRequest, name: str) -> str:
+    """
+    Build the cache key identifying the filters of a list: its filtering query parameters, sorted
+
+    :param request: The incoming request object
+    :param name: Name of the list, e.g. "ads"
+    :return: Cache key for compute_facets()
+    """
+    params: list[tuple[str, str]] = sorted((key, value) for key, values in request.GET.lists()
+                                           if key not in FACETS_IGNORED_PARAMS for value in values)
+    return f"{name}?{urlencode(params)}"
+
+
+def _aggregate(queryset: QuerySet, width: int) -> list[dict]:
+    # One GROUP BY over (category, price bucket): both facets are sums over its rows
+    return list(
+        queryset.order_by()
+        .annotate(bucket=Cast(F("price") / width, output_field=IntegerField()))
+        .values("category_id", "category__name", "bucket")
+        .annotate(count=Count("id"))
+    )
+
+
+def compute_facets(queryset: QuerySet, facets: list[str], cache_key: str) -> dict:
+    """
+    Count the advertisements per category and per price bucket of AD_PRICE_BUCKET_WIDTH
+
+    Results are cached for AD_FACETS_CACHE_TTL seconds under the data versions,
+    so a change of the ads or the categories is visible right away. Counts read right after a change
+    (from a replica that may lag behind) are not cached, as in data_etag()
+
+    :param queryset: Filtered advertisements queryset
+    :param facets: Requested facet names
+    :param cache_key: Identifies the filters of the queryset, see get_facets_cache_key()
+    :return: Dictionary facet name -> list of counts
+    """
+    if not facets:
+        return {}
+
+    width: int = settings.AD_PRICE_BUCKET_WIDTH
+    versions: dict[str, str] = get_versions("ads", "categories")
+    key: str = "|".join([cache_key, str(width), versions["ads"], versions["categories"]])
+    key = FACETS_KEY.format(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+
+    rows: list[dict] | None = cache.get(key)
+    if rows is None:
+        rows = _aggregate(queryset, width)
+        if is_settled(versions):
+            cache.set(key, rows, timeout=settings.AD_FACETS_CACHE_TTL)
+
+    result: dict = {}
+
+    if "category" in facets:
+        categories: dict[int, dict] = {}
+        for row in rows:
+            category: dict = categories.setdefault(row["category_id"], {
+                "id": row["category_id"], "name": row["category__name"], "count": 0})
+            category["count"] += row["count"]
+        result["category"] = sorted(categories.values(), key=lambda category: (-category["count"], category["name"]))
+
+    if "price_buckets" in facets:
+        buckets: dict[int, int] = {}
+        for row in rows:
+            buckets[row["bucket"]] = buckets.get(row["bucket"], 0) + row["count"]
+        result["price_buckets"] = [{
+            "from": bucket * width,
+            "to": (bucket + 1) * width,
+            "count": count
+        } for bucket, count in sorted(buckets.items())]
+
+    return result
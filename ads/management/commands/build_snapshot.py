@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ads.snapshot import build_snapshot
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Build the hot snapshot
+class Command(BaseCommand):
+    help = "Render the first ads pages and the categories list into the snapshot file shared by the workers"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--path", help="Snapshot file (AD_SNAPSHOT_PATH by default)")
+        parser.add_argument("--loop", action="store_true", help="Keep rebuilding the snapshot")
+        parser.add_argument("--interval", type=float, default=5, help="Seconds between the rebuilds with --loop")
+
+    def handle(self, *args, **options) -> None:
+        while True:
+            started: float = time.perf_counter()
+            stored: int = build_snapshot(options["path"])
+            self.stdout.write(self.style.SUCCESS(f"Stored {stored} responses in {time.perf_counter() - started:.3f} s"))
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
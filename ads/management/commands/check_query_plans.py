@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import QuerySet
+
+from Homework_28_PD12.query_plans import compare, explain, hot_querysets, load_baselines, save_baselines
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Check the plans of the hot queries
+class Command(BaseCommand):
+    help = "Compare the query plans of the list and detail views with the stored baselines"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--database", help="Database alias (by default the one the views read from)")
+        parser.add_argument("--update", action="store_true",
+                            help="Store the current plans as the baselines (run on production-like data)")
+
+    def handle(self, *args, **options) -> None:
+        querysets: dict[str, QuerySet] = hot_querysets()
+        if options["database"]:
+            querysets = {name: queryset.using(options["database"]) for name, queryset in querysets.items()}
+
+        vendors: set[str] = {connections[queryset.db].vendor for queryset in querysets.values()}
+        if len(vendors) != 1:
+            raise CommandError(f"The hot queries run on different databases: {', '.join(sorted(vendors))}")
+        vendor: str = vendors.pop()
+
+        try:
+            plans: dict[str, list[dict]] = {name: explain(queryset) for name, queryset in querysets.items()}
+        except ValueError as error:
+            raise CommandError(str(error)) from error
+
+        if options["update"]:
+            save_baselines(vendor, plans)
+            self.stdout.write(self.style.SUCCESS(f"Stored {len(plans)} {vendor} baselines"))
+            return
+
+        baselines: dict[str, list[dict]] = load_baselines(vendor)
+        failed: list[str] = []
+
+        for name, plan in plans.items():
+            if name not in baselines:
+                self.stdout.write(self.style.WARNING(f"{name}: no baseline, run with --update"))
+                continue
+
+            regressions, warnings = compare(baselines[name], plan)
+            for warning in warnings:
+                self.stdout.write(self.style.WARNING(f"{name}: {warning}"))
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(f"{name}: {regression}"))
+
+            if regressions:
+                failed.append(name)
+            else:
+                self.stdout.write(f"{name}: ok")
+
+        if failed:
+            raise CommandError(f"Query plan regressions in {', '.join(failed)}")
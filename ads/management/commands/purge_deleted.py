@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from ads.purge import purge_deleted
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Purge soft deleted rows
+class Command(BaseCommand):
+    help = "Remove soft deleted ads, users and categories in bounded batches"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows deleted per transaction")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Primary database alias")
+        parser.add_argument("--loop", action="store_true", help="Keep running as a background worker")
+        parser.add_argument("--interval", type=float, default=10, help="Seconds between the passes with --loop")
+
+    def handle(self, *args, **options) -> None:
+        while True:
+            deleted: int = purge_deleted(options["batch_size"], options["database"])
+            if deleted or not options["loop"]:
+                self.stdout.write(self.style.SUCCESS(f"Purged {deleted} rows"))
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from ads.stats import rebuild_category_stats
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Rebuild category statistics
+class Command(BaseCommand):
+    help = "Recalculate the category statistics from the ads table (repairs drift after bulk changes)"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Primary database alias")
+
+    def handle(self, *args, **options) -> None:
+        categories: int = rebuild_category_stats(options["database"])
+        self.stdout.write(self.style.SUCCESS(f"Statistics rebuilt for {categories} categories"))
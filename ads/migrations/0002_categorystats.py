@@ -0,0 +1,29 @@
+# Generated by Django 4.1.13 on 2026-10-19 15:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='ads.category')),
+                ('total_ads', models.PositiveIntegerField(default=0)),
+                ('published_ads', models.PositiveIntegerField(default=0)),
+                ('min_price', models.PositiveIntegerField(null=True)),
+                ('max_price', models.PositiveIntegerField(null=True)),
+                ('total_price', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Статистика категории',
+                'verbose_name_plural': 'Статистика категорий',
+            },
+        ),
+    ]
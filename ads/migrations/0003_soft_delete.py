@@ -0,0 +1,23 @@
+# Generated by Django 4.1.13 on 2026-10-19 15:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0002_categorystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='is_deleted',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='is_deleted',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
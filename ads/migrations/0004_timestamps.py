@@ -0,0 +1,25 @@
+# Generated by Django 4.1.13 on 2026-10-19 15:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0003_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='ad',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
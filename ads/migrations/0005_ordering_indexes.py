@@ -0,0 +1,21 @@
+# Generated by Django 4.1.13 on 2026-10-19 15:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0004_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['-price'], name='ads_ad_price_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['name'], name='ads_categor_name_6edef3_idx'),
+        ),
+    ]
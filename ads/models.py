@@ -1,5 +1,6 @@
 from django.db import models
 
+from Homework_28_PD12.managers import SoftDeleteManager
 from users.models import User
 
 
@@ -7,6 +8,10 @@ from users.models import User
 # Create category model
 class Category(models.Model):
     name: str = models.CharField(max_length=30)
+    is_deleted: bool = models.BooleanField(default=False, db_index=True)
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.name
@@ -14,6 +19,7 @@ class Category(models.Model):
     class Meta:
         verbose_name: str = "Категория"
         verbose_name_plural: str = "Категории"
+        indexes: list = [models.Index(fields=["name"])]
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -28,6 +34,12 @@ class Ad(models.Model):
     is_published: bool = models.BooleanField(choices=PUBLISHED, default=False)
     image = models.ImageField(upload_to="images/")
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    is_deleted: bool = models.BooleanField(default=False, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.name
@@ -35,3 +47,33 @@ class Ad(models.Model):
     class Meta:
         verbose_name: str = "Объявление"
         verbose_name_plural: str = "Объявления"
+        indexes: list = [models.Index(fields=["-price"], name="ads_ad_price_desc_idx")]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Create category statistics model
+class CategoryStats(models.Model):
+    """
+    Summary of the ads of a category, kept up to date by the Ad signals (see ads/stats.py)
+    """
+    category = models.OneToOneField(Category, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    total_ads: int = models.PositiveIntegerField(default=0)
+    published_ads: int = models.PositiveIntegerField(default=0)
+    min_price: int = models.PositiveIntegerField(null=True)
+    max_price: int = models.PositiveIntegerField(null=True)
+    total_price: int = models.PositiveBigIntegerField(default=0)
+
+    @property
+    def avg_price(self) -> float | None:
+        return self.total_price / self.total_ads if self.total_ads else None
+
+    @property
+    def published_ratio(self) -> float | None:
+        return self.published_ads / self.total_ads if self.total_ads else None
+
+    def __str__(self):
+        return str(self.category)
+
+    class Meta:
+        verbose_name: str = "Статистика категории"
+        verbose_name_plural: str = "Статистика категорий"
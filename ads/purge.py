@@ -0,0 +1,114 @@
+from django.db import transaction
+from django.db.models import Q, QuerySet, Exists, OuterRef
+from django.utils import timezone
+
+from Homework_28_PD12.versioning import bump_version
+from ads.models import Ad, Category
+from ads.stats import AdState, remove_from_category_stats
+from changes.log import record_changes
+from users.models import User
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Tombstones of the ads of tombstoned users and categories
+# Ad.objects only checks ads_ad.is_deleted (no joins), so the ads of a deleted user or category are tombstoned
+# themselves: by the delete view in the transaction of the parent, and by the purge for the parents
+# tombstoned by other paths (admin, bulk updates)
+def tombstone_ads(queryset: QuerySet, using: str, batch_size: int | None = None) -> int:
+    """
+    Tombstone the live ads of a queryset
+
+    One UPDATE, with the statistics adjusted in the same transaction and the deletes logged to the change feed,
+    as the signals of a save would do. The caller bumps the "ads" data version once its transaction is over
+
+    :param queryset: Ads to tombstone, e.g. Ad.all_objects.filter(author=user)
+    :param using: Database alias of the primary
+    :param batch_size: Maximum number of ads tombstoned by the call, all of them by default
+    :return: Number of tombstoned ads
+    """
+    with transaction.atomic(using=using):
+        rows: list[dict] = list(
+            queryset.using(using).select_for_update(of=("self",)).filter(is_deleted=False)
+            .order_by("pk").values("pk", "category_id", "price", "is_published", "is_deleted")[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        pks: list[int] = [row["pk"] for row in rows]
+        Ad.all_objects.using(using).filter(pk__in=pks).update(is_deleted=True, updated_at=timezone.now())
+        remove_from_category_stats([AdState.from_values(row) for row in rows], using)
+        record_changes(Ad._meta.label_lower, pks, "delete", using)
+
+    return len(rows)
+
+
+def tombstone_orphaned_batch(batch_size: int, using: str) -> int:
+    """
+    Tombstone at most batch_size live ads whose author or category is tombstoned
+
+    :param batch_size: Maximum number of ads tombstoned by the call
+    :param using: Database alias of the primary
+    :return: Number of tombstoned ads (0 when no ad is left)
+    """
+    tombstoned: int = tombstone_ads(Ad.all_objects.filter(Q(author__is_deleted=True) | Q(category__is_deleted=True)),
+                                    using, batch_size)
+    if tombstoned:
+        bump_version("ads")
+    return tombstoned
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Purge of tombstoned rows
+def _delete_batch(queryset: QuerySet, batch_size: int) -> int:
+    pks: list[int] = list(queryset.order_by("pk").values_list("pk", flat=True)[:batch_size])
+    if not pks:
+        return 0
+
+    deleted, _ = queryset.model.all_objects.using(queryset.db).filter(pk__in=pks).delete()
+    return deleted
+
+
+def purge_deleted_batch(batch_size: int, using: str) -> int:
+    """
+    Tombstone the ads of the tombstoned users and categories, then remove at most batch_size tombstoned ads,
+    then the tombstoned users and categories left without ads
+
+    Every call is a short transaction over a bounded number of rows, so deleting a prolific user
+    or a big category never loads all of its ads into memory at once. The rows removed by the database cascades
+    (locations of the users, statistics of the categories) send no signals: the data versions are bumped here
+
+    :param batch_size: Maximum number of rows of a model deleted by the call
+    :param using: Database alias of the primary
+    :return: Number of tombstoned or deleted rows (0 when nothing is left to purge)
+    """
+    tombstoned: int = tombstone_orphaned_batch(batch_size, using)
+    if tombstoned:
+        return tombstoned
+
+    deleted: int = _delete_batch(Ad.all_objects.using(using).filter(is_deleted=True), batch_size)
+    if deleted:
+        bump_version("ads")
+        return deleted
+
+    has_ads = Ad.all_objects.using(using)
+    users: QuerySet = User.all_objects.using(using).filter(is_deleted=True) \
+        .exclude(Exists(has_ads.filter(author_id=OuterRef("pk"))))
+    categories: QuerySet = Category.all_objects.using(using).filter(is_deleted=True) \
+        .exclude(Exists(has_ads.filter(category_id=OuterRef("pk"))))
+
+    deleted = _delete_batch(users, batch_size) + _delete_batch(categories, batch_size)
+    if deleted:
+        bump_version("users", "categories")
+    return deleted
+
+
+def purge_deleted(batch_size: int, using: str) -> int:
+    """
+    Purge all tombstoned rows batch by batch
+
+    :return: Number of deleted rows
+    """
+    total: int = 0
+    while deleted := purge_deleted_batch(batch_size, using):
+        total += deleted
+    return total
@@ -0,0 +1,43 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from Homework_28_PD12.versioning import bump_version
+from ads.models import Ad, Category
+from ads.stats import AdState, update_category_stats
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Data versions
+@receiver([post_save, post_delete], sender=Ad)
+def ad_changed(sender, **kwargs) -> None:
+    bump_version("ads")
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, **kwargs) -> None:
+    bump_version("categories")
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Category statistics
+@receiver(pre_save, sender=Ad)
+def remember_ad_state(sender, instance: Ad, using: str, raw: bool = False, **kwargs) -> None:
+    if raw or instance.pk is None:
+        instance._stats_previous = None
+        return
+
+    previous: dict | None = Ad.all_objects.using(using).filter(pk=instance.pk) \
+        .values("category_id", "price", "is_published", "is_deleted").first()
+    instance._stats_previous = AdState.from_values(previous) if previous else None
+
+
+@receiver(post_save, sender=Ad)
+def update_stats_on_save(sender, instance: Ad, using: str, raw: bool = False, **kwargs) -> None:
+    if raw:
+        return
+    update_category_stats(getattr(instance, "_stats_previous", None), AdState.from_ad(instance), using)
+
+
+@receiver(post_delete, sender=Ad)
+def update_stats_on_delete(sender, instance: Ad, using: str, **kwargs) -> None:
+    update_category_stats(AdState.from_ad(instance), None, using)
@@ -0,0 +1,157 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.utils.http import quote_etag
+
+from Homework_28_PD12.db_router import is_pinned_to_primary, use_primary
+from Homework_28_PD12.versioning import get_versions, versions_etag
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Snapshot file
+# Header (magic, length of the index), JSON index, then the response bodies one after another:
+#
+#   {"built_at": ..., "versions": {data set: token}, "entries": {key: [offset, length, [data sets]]}}
+MAGIC: bytes = b"HOTSNAP1"
+HEADER = struct.Struct("<8sQ")
+
+# Data sets the responses of the snapshot depend on (the same as their ETags)
+ADS_DATA: list[str] = ["ads", "categories", "users"]
+CATEGORIES_DATA: list[str] = ["categories"]
+
+
+def build_snapshot(path: str | None = None) -> int:
+    """
+    Render the first AD_SNAPSHOT_PAGES pages of /ad/ and the /cat/ list and swap the snapshot file atomically
+
+    The versions are read before the rendering: a change made meanwhile makes the new snapshot stale right away
+
+    :param path: Snapshot file, AD_SNAPSHOT_PATH by default
+    :return: Number of stored responses
+    """
+    # Loaded only by the rebuild, never on the request path serving the snapshot
+    from django.test import RequestFactory
+
+    from ads.views import AdListView, CategoryListView
+
+    path = path or settings.AD_SNAPSHOT_PATH
+    versions: dict[str, str] = get_versions(*ADS_DATA)
+    factory = RequestFactory()
+    responses: dict[str, tuple[bytes, list[str]]] = {}
+
+    with use_primary():
+        response: HttpResponse = CategoryListView.as_view(use_snapshot=False)(factory.get("/cat/"))
+        responses["categories"] = (response.content, CATEGORIES_DATA)
+
+        for page in range(1, settings.AD_SNAPSHOT_PAGES + 1):
+            response = AdListView.as_view(use_snapshot=False)(factory.get("/ad/", {"page": page}))
+            responses[f"ads:{page}"] = (response.content, ADS_DATA)
+            if page >= json.loads(response.content)["num_pages"]:
+                break
+
+    entries: dict[str, list] = {}
+    offset: int = 0
+    for key, (body, data) in responses.items():
+        entries[key] = [offset, len(body), data]
+        offset += len(body)
+    index: bytes = json.dumps({"built_at": time.time(), "versions": versions, "entries": entries}).encode()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path: str = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(index)))
+        f.write(index)
+        for body, _ in responses.values():
+            f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_path, path)
+
+    return len(responses)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Reading
+class Snapshot:
+    """
+    Read-only memory map of a snapshot file, shared through the page cache by all worker processes
+
+    A rebuilt file has a new inode: the old map stays valid for the requests still using it
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            stat: os.stat_result = os.fstat(f.fileno())
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.identity: tuple[int, int] = (stat.st_ino, stat.st_mtime_ns)
+        magic, index_length = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC:
+            raise ValueError(f"Not a snapshot file: {path}")
+
+        index: dict = json.loads(self.buffer[HEADER.size:HEADER.size + index_length])
+        self.built_at: float = index["built_at"]
+        self.versions: dict[str, str] = index["versions"]
+        self.entries: dict[str, list] = index["entries"]
+        self.start: int = HEADER.size + index_length
+
+    def body(self, key: str) -> memoryview:
+        offset, length, _ = self.entries[key]
+        return memoryview(self.buffer)[self.start + offset:self.start + offset + length]
+
+
+_snapshot: Snapshot | None = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot() -> Snapshot | None:
+    """
+    Get the map of the current snapshot file, remapped after a rebuild
+
+    :return: Snapshot or None if the file doesn't exist yet
+    """
+    global _snapshot
+
+    try:
+        stat: os.stat_result = os.stat(settings.AD_SNAPSHOT_PATH)
+    except FileNotFoundError:
+        return None
+
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.identity != (stat.st_ino, stat.st_mtime_ns):
+            _snapshot = Snapshot(settings.AD_SNAPSHOT_PATH)
+    return _snapshot
+
+
+def snapshot_response(request: HttpRequest, key: str) -> HttpResponse | None:
+    """
+    Serve a response from the snapshot when AD_SNAPSHOT_ENABLED
+
+    A snapshot is served while the data it depends on is unchanged, and after a change
+    for at most AD_SNAPSHOT_MAX_STALENESS seconds since it was built (never to clients pinned to the primary)
+
+    :param request: The incoming request object
+    :param key: Snapshot entry, e.g. "ads:1" or "categories"
+    :return: JSON response or None if the view must query the database
+    """
+    if not settings.AD_SNAPSHOT_ENABLED:
+        return None
+
+    snapshot: Snapshot | None = get_snapshot()
+    if snapshot is None or key not in snapshot.entries:
+        return None
+
+    data: list[str] = snapshot.entries[key][2]
+    versions: dict[str, str] = {name: snapshot.versions[name] for name in data}
+    if get_versions(*data) != versions:
+        if is_pinned_to_primary() or time.time() - snapshot.built_at > settings.AD_SNAPSHOT_MAX_STALENESS:
+            return None
+
+    response = HttpResponse(snapshot.body(key), content_type="application/json")
+    response.headers["ETag"] = quote_etag(versions_etag(request.get_full_path(), versions))
+    return response
@@ -0,0 +1,125 @@
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import Count, Q, Min, Max, Sum, QuerySet
+
+from Homework_28_PD12.versioning import bump_version
+from ads.models import Ad, CategoryStats
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Incremental update of the category statistics
+class AdState(NamedTuple):
+    """
+    Part of an ad that contributes to the statistics of its category
+    Tombstoned ads don't contribute, their state is None
+    """
+    category_id: int
+    price: int
+    is_published: bool
+
+    @classmethod
+    def from_ad(cls, advertisement: Ad) -> "AdState | None":
+        if advertisement.is_deleted:
+            return None
+        return cls(int(advertisement.category_id), int(advertisement.price), bool(advertisement.is_published))
+
+    @classmethod
+    def from_values(cls, values: dict) -> "AdState | None":
+        if values["is_deleted"]:
+            return None
+        return cls(int(values["category_id"]), int(values["price"]), bool(values["is_published"]))
+
+
+def _add(state: AdState, using: str) -> None:
+    stats, _ = CategoryStats.objects.using(using).select_for_update().get_or_create(category_id=state.category_id)
+
+    stats.total_ads += 1
+    stats.published_ads += state.is_published
+    stats.total_price += state.price
+    stats.min_price = state.price if stats.min_price is None else min(stats.min_price, state.price)
+    stats.max_price = state.price if stats.max_price is None else max(stats.max_price, state.price)
+    stats.save(using=using)
+
+
+def _remove(category_id: int, states: list[AdState], using: str) -> None:
+    stats: CategoryStats | None = CategoryStats.objects.using(using).select_for_update() \
+        .filter(category_id=category_id).first()
+    if stats is None:
+        return
+
+    stats.total_ads = max(stats.total_ads - len(states), 0)
+    stats.published_ads = max(stats.published_ads - sum(state.is_published for state in states), 0)
+    stats.total_price = max(stats.total_price - sum(state.price for state in states), 0)
+
+    if not stats.total_ads:
+        stats.min_price = stats.max_price = None
+    elif any(state.price in (stats.min_price, stats.max_price) for state in states):
+        # A removed ad may have been the cheapest/most expensive one: recalculate over its category only
+        prices: dict = Ad.all_objects.using(using).filter(category_id=category_id, is_deleted=False) \
+            .aggregate(min_price=Min("price"), max_price=Max("price"))
+        stats.min_price, stats.max_price = prices["min_price"], prices["max_price"]
+
+    stats.save(using=using)
+
+
+def update_category_stats(previous: AdState | None, current: AdState | None, using: str) -> None:
+    """
+    Move the contribution of an ad from its previous state to the current one
+
+    :param previous: State before the change (None for a new ad)
+    :param current: State after the change (None for a deleted ad)
+    :param using: Database alias the change was written to
+    """
+    if previous == current:
+        return
+
+    with transaction.atomic(using=using):
+        if previous is not None:
+            _remove(previous.category_id, [previous], using)
+        if current is not None:
+            _add(current, using)
+
+
+def remove_from_category_stats(states: list[AdState], using: str) -> None:
+    """
+    Take the contribution of ads tombstoned in bulk (without signals) out of the statistics,
+    one update per category
+
+    :param states: States of the ads before they were tombstoned
+    :param using: Database alias the change was written to
+    """
+    categories: dict[int, list[AdState]] = {}
+    for state in states:
+        categories.setdefault(state.category_id, []).append(state)
+
+    with transaction.atomic(using=using):
+        for category_id, removed in sorted(categories.items()):
+            _remove(category_id, removed, using)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Full rebuild
+def rebuild_category_stats(using: str) -> int:
+    """
+    Recalculate the statistics of all categories from the ads table
+    The rows are replaced in bulk, without signals, so the version of the categories is bumped here
+
+    :param using: Database alias of the primary
+    :return: Number of categories with ads
+    """
+    with transaction.atomic(using=using):
+        advertisements: QuerySet = Ad.all_objects.using(using).filter(is_deleted=False).order_by()
+        rows: list[dict] = list(advertisements.values("category_id").annotate(
+            total_ads=Count("id"),
+            published_ads=Count("id", filter=Q(is_published=True)),
+            min_price=Min("price"),
+            max_price=Max("price"),
+            total_price=Sum("price"),
+        ))
+
+        CategoryStats.objects.using(using).all().delete()
+        CategoryStats.objects.using(using).bulk_create([CategoryStats(**row) for row in rows])
+
+    bump_version("categories")
+    return len(rows)
@@ -0,0 +1,48 @@
+import os
+
+from django.core.files import File
+from django.db import DEFAULT_DB_ALIAS
+
+from Homework_28_PD12.db_router import use_primary
+from ads.models import Ad
+from ads.purge import purge_deleted
+from ads.snapshot import build_snapshot
+from ads.stats import rebuild_category_stats
+from jobs.queue import task
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Background jobs of the ads app
+@task("ads.store_image")
+def store_image(ad_id: int, path: str, filename: str) -> None:
+    """
+    Move a staged upload (see ads/uploads.py) to the media storage and attach it to the ad
+
+    The ad is read from the primary: a worker is never pinned and a lagging replica may not have it yet.
+    An ad missing there fails the job (retried, then kept as failed with the staged file);
+    the upload of an ad deleted meanwhile is dropped
+    """
+    with use_primary():
+        advertisement: Ad = Ad.all_objects.get(pk=ad_id)
+
+    if not advertisement.is_deleted:
+        with open(path, "rb") as f:
+            advertisement.image.save(filename, File(f), save=False)
+        advertisement.save(update_fields=["image", "updated_at"])
+
+    os.remove(path)
+
+
+@task("ads.purge_deleted")
+def purge_deleted_rows(batch_size: int = 1000) -> None:
+    purge_deleted(batch_size, DEFAULT_DB_ALIAS)
+
+
+@task("ads.rebuild_category_stats")
+def rebuild_stats() -> None:
+    rebuild_category_stats(DEFAULT_DB_ALIAS)
+
+
+@task("ads.build_snapshot")
+def rebuild_snapshot() -> None:
+    build_snapshot()
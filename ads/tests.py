@@ -1,3 +1,650 @@
-from django.test import TestCase
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connections, router
+from django.db.models import Max
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from Homework_28_PD12 import ratelimit
+from Homework_28_PD12.db_router import use_primary
+from Homework_28_PD12.middleware import WriteConcurrencyLimitMiddleware
+from Homework_28_PD12.query_plans import compare, explain
+from Homework_28_PD12.versioning import get_versions, is_settled, last_changed_at
+from ads.facets import get_facets_cache_key
+from ads.models import Ad, Category, CategoryStats
+from ads.purge import purge_deleted, tombstone_orphaned_batch
+from ads.snapshot import build_snapshot, snapshot_response
+from ads.stats import rebuild_category_stats
+from ads.tasks import store_image
+from changes.models import Change
+from jobs.models import Job
+from users.factories import create_user
+from users.models import User
+
+
+def create_ad(author: User, category: Category, price: int = 100, **kwargs) -> Ad:
+    return Ad.objects.create(name=kwargs.pop("name", "Объявление"), author=author, category=category, price=price,
+                             description="Описание", **kwargs)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Read replicas
+@override_settings(DATABASE_REPLICAS=["replica"])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(Ad.objects.all().db, "replica")
+        self.assertEqual(Category.objects.all().db, "replica")
+
+    def test_reads_of_not_replicated_apps_go_to_the_primary(self):
+        self.assertEqual(Change.objects.all().db, "default")
+        self.assertEqual(Job.objects.all().db, "default")
+
+    def test_writes_go_to_the_primary(self):
+        self.assertEqual(router.db_for_write(Ad), "default")
+        self.assertEqual(Ad.objects.select_for_update().db, "default")
+
+    def test_pinned_reads_go_to_the_primary(self):
+        with use_primary():
+            self.assertEqual(Ad.objects.all().db, "default")
+        self.assertEqual(Ad.objects.all().db, "replica")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        self.assertEqual(Ad.objects.all().db, "default")
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaPinningTests(TransactionTestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self) -> None:
+        Category.objects.create(name="Книги")
+
+    def get_categories(self) -> tuple[list[str], list[str]]:
+        """
+        Request the categories list
+
+        :return: SQL run on the primary and on the replica
+        """
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections["replica"]) as replica:
+            response = self.client.get("/cat/")
+        self.assertEqual(response.status_code, 200)
+        return [query["sql"] for query in primary], [query["sql"] for query in replica]
+
+    def test_reads_are_served_by_the_replica(self):
+        primary, replica = self.get_categories()
+        self.assertEqual(primary, [])
+        self.assertTrue(replica)
+
+    def test_write_pins_the_client_to_the_primary(self):
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            response = self.client.post("/cat/create/", json.dumps({"name": "Игры"}), content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(replica), 0)
+
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], settings.REPLICA_PIN_SECONDS)
+
+        primary, replica = self.get_categories()
+        self.assertTrue(primary)
+        self.assertEqual(replica, [])
+
+    def test_pin_expires(self):
+        self.client.post("/cat/create/", json.dumps({"name": "Игры"}), content_type="application/json")
+
+        later: float = time.time() + settings.REPLICA_PIN_SECONDS + 1
+        with mock.patch("Homework_28_PD12.middleware.time.time", return_value=later):
+            primary, replica = self.get_categories()
+        self.assertEqual(primary, [])
+        self.assertTrue(replica)
+
+    def test_forged_pin_is_ignored(self):
+        self.client.cookies[settings.REPLICA_PIN_COOKIE] = "1"
+        primary, replica = self.get_categories()
+        self.assertEqual(primary, [])
+        self.assertTrue(replica)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Field projection
+class AdProjectionTests(TestCase):
+    def setUp(self) -> None:
+        self.advertisement: Ad = create_ad(create_user(), Category.objects.create(name="Книги"), price=500,
+                                           is_published=True)
+
+    def test_default_fields(self):
+        response = self.client.get("/ad/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["items"], [{
+            "name": "Объявление", "price": 500, "description": "Описание", "image": None,
+            "author": "user", "category": "Книги",
+        }])
+
+    def test_only_requested_columns_are_loaded(self):
+        with CaptureQueriesContext(connections["default"]) as queries:
+            response = self.client.get("/ad/", {"fields": "id,price"})
+        self.assertEqual(response.json()["items"], [{"id": self.advertisement.id, "price": 500}])
+
+        page_query: str = queries[-1]["sql"]
+        self.assertIn('"ads_ad"."price"', page_query)
+        self.assertNotIn('"ads_ad"."description"', page_query)
+        self.assertNotIn('"users_user"."username"', page_query)
+
+    def test_related_field_joins_only_its_table(self):
+        with CaptureQueriesContext(connections["default"]) as queries:
+            response = self.client.get(f"/ad/{self.advertisement.id}/", {"fields": "name,author"})
+        self.assertEqual(response.json(), {"name": "Объявление", "author": "user"})
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"users_user"."username"', queries[0]["sql"])
+        self.assertNotIn('"ads_category"', queries[0]["sql"])
+
+    def test_unknown_field(self):
+        self.assertEqual(self.client.get("/ad/", {"fields": "name,password"}).status_code, 400)
+        self.assertEqual(self.client.get(f"/ad/{self.advertisement.id}/", {"fields": ","}).status_code, 400)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Data versions and ETags
+class VersioningTests(TestCase):
+    def setUp(self) -> None:
+        self.category: Category = Category.objects.create(name="Книги")
+
+    def settled(self):
+        later: float = time.time() + settings.REPLICA_PIN_SECONDS + 1
+        return mock.patch("Homework_28_PD12.versioning.time.time", return_value=later)
+
+    def test_last_changed_at(self):
+        self.assertEqual(last_changed_at({"ads": "a:10.5", "users": "b:20.25"}), 20.25)
+
+    def test_no_etag_right_after_a_change(self):
+        self.assertFalse(is_settled(get_versions("categories")))
+        self.assertFalse(self.client.get("/cat/").has_header("ETag"))
+
+        with self.settled():
+            self.assertTrue(is_settled(get_versions("categories")))
+            etag: str = self.client.get("/cat/")["ETag"]
+            self.assertEqual(self.client.get("/cat/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_pinned_reads_get_an_etag_right_after_a_change(self):
+        with use_primary():
+            self.assertTrue(is_settled(get_versions("categories")))
+
+    def test_bulk_paths_bump_versions(self):
+        create_ad(create_user(), self.category)
+
+        before: dict[str, str] = get_versions("categories")
+        rebuild_category_stats("default")
+        self.assertNotEqual(get_versions("categories"), before)
+
+        Category.all_objects.filter(pk=self.category.pk).update(is_deleted=True)
+        before = get_versions("ads", "categories")
+        purge_deleted(batch_size=10, using="default")
+        after: dict[str, str] = get_versions("ads", "categories")
+        self.assertNotEqual(after["ads"], before["ads"])
+        self.assertNotEqual(after["categories"], before["categories"])
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Snapshot
+class SnapshotTests(TestCase):
+    def test_build_and_serve(self):
+        create_ad(create_user(), Category.objects.create(name="Книги"))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, "hot.bin")
+            self.assertEqual(build_snapshot(path), 2)
+            with override_settings(AD_SNAPSHOT_ENABLED=True, AD_SNAPSHOT_PATH=path):
+                response: HttpResponse = snapshot_response(RequestFactory().get("/cat/"), "categories")
+                self.assertEqual(json.loads(bytes(response.content)), self.client.get("/cat/").json())
+
+    def test_serving_does_not_load_django_test(self):
+        code: str = ("import sys, django; django.setup(); import ads.snapshot, Homework_28_PD12.urls; "
+                     "print('django.test' in sys.modules)")
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                env={**os.environ, "DJANGO_SETTINGS_MODULE": "Homework_28_PD12.settings_test"},
+                                cwd=settings.BASE_DIR)
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Category statistics
+class CategoryStatsTests(TestCase):
+    def setUp(self) -> None:
+        self.author: User = create_user()
+        self.books: Category = Category.objects.create(name="Книги")
+        self.games: Category = Category.objects.create(name="Игры")
+
+    def stats(self) -> dict[int, tuple]:
+        return {stats.category_id: (stats.total_ads, stats.published_ads, stats.min_price, stats.max_price,
+                                    stats.total_price) for stats in CategoryStats.objects.all()}
+
+    def assertStatsRebuildable(self) -> None:
+        incremental: dict[int, tuple] = {category: stats for category, stats in self.stats().items() if stats[0]}
+        rebuild_category_stats("default")
+        self.assertEqual(incremental, self.stats())
+
+    def test_new_ads(self):
+        create_ad(self.author, self.books, price=100, is_published=True)
+        create_ad(self.author, self.books, price=300)
+        self.assertEqual(self.stats(), {self.books.id: (2, 1, 100, 300, 400)})
+        self.assertStatsRebuildable()
+
+    def test_changed_ad_moves_between_categories(self):
+        advertisement: Ad = create_ad(self.author, self.books, price=100)
+        create_ad(self.author, self.books, price=500)
+
+        advertisement.category = self.games
+        advertisement.price = 200
+        advertisement.is_published = True
+        advertisement.save()
+
+        self.assertEqual(self.stats()[self.books.id], (1, 0, 500, 500, 500))
+        self.assertEqual(self.stats()[self.games.id], (1, 1, 200, 200, 200))
+        self.assertStatsRebuildable()
+
+    def test_removed_extreme_price_is_recalculated(self):
+        cheapest: Ad = create_ad(self.author, self.books, price=100)
+        create_ad(self.author, self.books, price=300)
+        most_expensive: Ad = create_ad(self.author, self.books, price=900)
+
+        cheapest.is_deleted = True
+        cheapest.save()
+        most_expensive.delete()
+
+        self.assertEqual(self.stats()[self.books.id], (1, 0, 300, 300, 300))
+        self.assertStatsRebuildable()
+
+    def test_last_ad_removed(self):
+        create_ad(self.author, self.books, price=100).delete()
+        self.assertEqual(self.stats()[self.books.id], (0, 0, None, None, 0))
+
+    def test_stats_view(self):
+        create_ad(self.author, self.books, price=100, is_published=True)
+        create_ad(self.author, self.books, price=300)
+
+        response = self.client.get("/cat/stats/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [
+            {"id": self.games.id, "name": "Игры", "total_ads": 0, "published_ads": 0, "published_ratio": None,
+             "min_price": None, "max_price": None, "avg_price": None},
+            {"id": self.books.id, "name": "Книги", "total_ads": 2, "published_ads": 1, "published_ratio": 0.5,
+             "min_price": 100, "max_price": 300, "avg_price": 200.0},
+        ])
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Rate limiting and admission control
+class TokenBucketTests(SimpleTestCase):
+    def test_parse_rate(self):
+        self.assertEqual(ratelimit.parse_rate("30/m"), (30, 0.5))
+        self.assertEqual(ratelimit.parse_rate("5/second"), (5, 5))
+
+    def test_refill_is_capped(self):
+        self.assertEqual(ratelimit.refill(0, updated_at=0, now=2, capacity=10, speed=0.5), 1)
+        self.assertEqual(ratelimit.refill(9, updated_at=0, now=100, capacity=10, speed=0.5), 10)
+
+    def test_take(self):
+        self.assertEqual(ratelimit.take(1.5, speed=0.5), (0.5, True, 0.0))
+        self.assertEqual(ratelimit.take(0.5, speed=0.5), (0.5, False, 1.0))
+
+    def assertBackendLimits(self, backend, clock: str) -> None:
+        with mock.patch(clock, return_value=1000.0):
+            self.assertEqual([backend.consume("key", 2, 0.5)[0] for _ in range(3)], [True, True, False])
+            self.assertEqual(backend.consume("key", 2, 0.5), (False, 2.0))
+            self.assertTrue(backend.consume("other", 2, 0.5)[0])
+        with mock.patch(clock, return_value=1002.0):
+            self.assertEqual([backend.consume("key", 2, 0.5)[0] for _ in range(2)], [True, False])
+
+    def test_memory_backend(self):
+        self.assertBackendLimits(ratelimit.InMemoryBackend(), "Homework_28_PD12.ratelimit.time.monotonic")
+
+    def test_sqlite_backend(self):
+        with tempfile.TemporaryDirectory() as directory:
+            backend = ratelimit.SQLiteBackend(os.path.join(directory, "ratelimit.sqlite3"))
+            self.assertBackendLimits(backend, "Homework_28_PD12.ratelimit.time.time")
+            backend.connection.close()
+
+
+@override_settings(RATELIMIT_ENABLED=True, RATELIMIT_BACKEND="memory", RATELIMIT_RATES={"ad_create": "2/m"})
+class RateLimitTests(TestCase):
+    def setUp(self) -> None:
+        ratelimit._backend = None
+        self.addCleanup(setattr, ratelimit, "_backend", None)
+        self.body: str = json.dumps({"name": "Объявление", "price": 1, "description": "Описание",
+                                     "author_id": create_user().id, "category_id": Category.objects.create().id})
+
+    def post(self, address: str = "10.0.0.1"):
+        return self.client.post("/ad/create/", self.body, content_type="application/json", REMOTE_ADDR=address)
+
+    def test_client_over_its_limit_is_rejected(self):
+        self.assertEqual([self.post().status_code for _ in range(2)], [200, 200])
+
+        response = self.post()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+        self.assertEqual(Ad.objects.count(), 2)
+
+        self.assertEqual(self.post("10.0.0.2").status_code, 200)
+
+
+@override_settings(MAX_CONCURRENT_WRITES=1, WRITE_ADMISSION_TIMEOUT=0.01, WRITE_ADMISSION_RETRY_AFTER=2)
+class AdmissionControlTests(SimpleTestCase):
+    def test_writes_over_the_cap_are_rejected(self):
+        entered = threading.Event()
+        release = threading.Event()
+
+        def get_response(request) -> HttpResponse:
+            if "HTTP_X_SLOW" in request.META:
+                entered.set()
+                release.wait(5)
+            return HttpResponse()
+
+        middleware = WriteConcurrencyLimitMiddleware(get_response)
+        factory = RequestFactory()
+        slow_write = threading.Thread(target=middleware, args=(factory.post("/ad/create/", HTTP_X_SLOW="1"),))
+        slow_write.start()
+        entered.wait(5)
+
+        try:
+            response = middleware(factory.post("/ad/create/"))
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "2")
+
+            # Reads don't wait for the write slots
+            self.assertEqual(middleware(factory.get("/ad/")).status_code, 200)
+        finally:
+            release.set()
+            slow_write.join()
+
+        self.assertEqual(middleware(factory.post("/ad/create/")).status_code, 200)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Soft delete
+class SoftDeleteTests(TestCase):
+    def setUp(self) -> None:
+        self.author: User = create_user("author")
+        self.other: User = create_user("other")
+        self.books: Category = Category.objects.create(name="Книги")
+        self.games: Category = Category.objects.create(name="Игры")
+
+    def test_ads_queries_check_only_their_own_column(self):
+        sql: str = str(Ad.objects.filter(price__gt=0).order_by("-price").query)
+        self.assertNotIn("JOIN", sql)
+
+    def test_ads_of_a_deleted_author_are_tombstoned_in_bulk(self):
+        create_ad(self.author, self.books, price=100, is_published=True)
+        create_ad(self.author, self.games, price=900)
+        kept: Ad = create_ad(self.other, self.books, price=300)
+        User.objects.filter(pk=self.author.pk).update(is_deleted=True)
+        last_change: int = Change.objects.aggregate(last=Max("id"))["last"] or 0
+        version: str = get_versions("ads")["ads"]
+
+        with CaptureQueriesContext(connections["default"]) as queries, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(tombstone_orphaned_batch(batch_size=1, using="default"), 1)
+        self.assertEqual(len([query for query in queries if query["sql"].startswith("UPDATE \"ads_ad\"")]), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(tombstone_orphaned_batch(batch_size=10, using="default"), 1)
+        self.assertEqual(tombstone_orphaned_batch(batch_size=10, using="default"), 0)
+
+        self.assertEqual(list(Ad.objects.values_list("pk", flat=True)), [kept.pk])
+        self.assertNotEqual(get_versions("ads")["ads"], version)
+        self.assertEqual(Change.objects.filter(id__gt=last_change, action="delete").count(), 2)
+
+        stats: dict[int, CategoryStats] = {stats.category_id: stats for stats in CategoryStats.objects.all()}
+        self.assertEqual((stats[self.books.id].total_ads, stats[self.books.id].published_ads,
+                          stats[self.books.id].min_price, stats[self.books.id].max_price), (1, 0, 300, 300))
+        self.assertEqual(stats[self.games.id].total_ads, 0)
+
+    def test_delete_user(self):
+        create_ad(self.author, self.books)
+        kept: Ad = create_ad(self.other, self.books)
+
+        self.assertEqual(self.client.delete(f"/user/{self.author.pk}/delete/").status_code, 200)
+
+        # JOBS_EAGER: the purge job has run inside the request
+        self.assertFalse(User.all_objects.filter(pk=self.author.pk).exists())
+        self.assertEqual(list(Ad.all_objects.values_list("pk", flat=True)), [kept.pk])
+        self.assertEqual(CategoryStats.objects.get(category=self.books).total_ads, 1)
+
+    def test_delete_category(self):
+        create_ad(self.author, self.books)
+        kept: Ad = create_ad(self.author, self.games)
+
+        self.assertEqual(self.client.delete(f"/cat/{self.books.pk}/delete/").status_code, 200)
+
+        self.assertFalse(Category.all_objects.filter(pk=self.books.pk).exists())
+        self.assertEqual(list(Ad.all_objects.values_list("pk", flat=True)), [kept.pk])
+
+
+    @override_settings(JOBS_EAGER=False)
+    def test_ads_are_hidden_without_a_purge_worker(self):
+        hidden: Ad = create_ad(self.author, self.books)
+        kept: Ad = create_ad(self.other, self.games)
+        create_ad(self.other, self.books)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f"/user/{self.author.pk}/delete/").status_code, 200)
+            self.assertEqual(self.client.delete(f"/cat/{self.books.pk}/delete/").status_code, 200)
+
+        self.assertEqual([item["id"] for item in self.client.get("/ad/", {"fields": "id"}).json()["items"]], [kept.pk])
+        self.assertEqual(self.client.get(f"/ad/{hidden.pk}/").status_code, 404)
+        self.assertEqual(CategoryStats.objects.get(category=self.books).total_ads, 0)
+        self.assertEqual(Change.objects.filter(model="ads.ad", action="delete").count(), 2)
+        self.assertEqual(Job.objects.filter(task="ads.purge_deleted").count(), 1)
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Facets
+@override_settings(AD_PRICE_BUCKET_WIDTH=1000)
+class FacetsTests(TestCase):
+    def setUp(self) -> None:
+        author: User = create_user()
+        self.books: Category = Category.objects.create(name="Книги")
+        self.games: Category = Category.objects.create(name="Игры")
+        for price, category in [(100, self.books), (999, self.books), (1000, self.games), (2500, self.books)]:
+            create_ad(author, category, price=price)
+
+    def get_facets(self, facets: str) -> dict:
+        response = self.client.get("/ad/", {"facets": facets})
+        self.assertEqual(response.status_code, 200)
+        return response.json()["facets"]
+
+    def test_facets(self):
+        self.assertEqual(self.get_facets("category,price_buckets"), {
+            "category": [
+                {"id": self.books.id, "name": "Книги", "count": 3},
+                {"id": self.games.id, "name": "Игры", "count": 1},
+            ],
+            "price_buckets": [
+                {"from": 0, "to": 1000, "count": 2},
+                {"from": 1000, "to": 2000, "count": 1},
+                {"from": 2000, "to": 3000, "count": 1},
+            ],
+        })
+
+    def test_no_facets_by_default(self):
+        self.assertNotIn("facets", self.client.get("/ad/").json())
+
+    def test_unknown_facet(self):
+        self.assertEqual(self.client.get("/ad/", {"facets": "category,author"}).status_code, 400)
+
+    def test_counts_are_cached_until_the_ads_change(self):
+        later: float = time.time() + settings.REPLICA_PIN_SECONDS + 1
+        with mock.patch("Homework_28_PD12.versioning.time.time", return_value=later):
+            self.get_facets("category")
+            with CaptureQueriesContext(connections["default"]) as queries:
+                self.get_facets("category")
+            self.assertFalse(any("GROUP BY" in query["sql"] for query in queries))
+
+            create_ad(create_user("other"), self.games, price=10)
+
+        self.assertEqual([category["count"] for category in self.get_facets("category")["category"]], [3, 2])
+
+
+    def test_cache_key_identifies_the_filters(self):
+        factory = RequestFactory()
+
+        def key(params: str) -> str:
+            return get_facets_cache_key(factory.get(f"/ad/?{params}"), "ads")
+
+        self.assertEqual(key("facets=category&page=2&fields=id"), key("facets=price_buckets"))
+        self.assertEqual(key("price=1&category=2"), key("category=2&price=1&page=3"))
+        self.assertNotEqual(key("category=1"), key("category=2"))
+        self.assertNotEqual(key("category=1"), key(""))
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Query plan guard
+class QueryPlanGuardTests(TestCase):
+    def check_plans(self) -> str:
+        output = StringIO()
+        call_command("check_query_plans", stdout=output)
+        return output.getvalue()
+
+    def test_plans_match_the_baselines(self):
+        self.assertIn("ads.list: ok", self.check_plans())
+
+    def test_dropped_index_fails_the_guard(self):
+        # Rolled back with the transaction of the test
+        with connections["default"].cursor() as cursor:
+            cursor.execute("DROP INDEX ads_ad_price_desc_idx")
+
+        with self.assertRaisesMessage(CommandError, "ads.list"):
+            self.check_plans()
+
+    def test_compare(self):
+        baseline: list[dict] = [{"node": "SCAN", "relation": "ads_ad", "index": "ads_ad_price_desc_idx", "rows": None}]
+        current: list[dict] = [{"node": "SCAN", "relation": "ads_ad", "index": None, "rows": None},
+                               {"node": "USE TEMP B-TREE FOR ORDER BY", "relation": None, "index": None, "rows": None}]
+        regressions, warnings = compare(baseline, current)
+        self.assertEqual(regressions, ["ads_ad doesn't use ads_ad_price_desc_idx any more (SCAN)",
+                                       "new USE TEMP B-TREE FOR ORDER BY node"])
+        self.assertEqual(warnings, [])
+
+    def test_unsupported_database(self):
+        with mock.patch.object(connections["default"], "vendor", "oracle"):
+            with self.assertRaisesMessage(ValueError, "not supported on oracle"):
+                explain(Ad.objects.all())
+            with self.assertRaisesMessage(CommandError, "not supported on oracle"):
+                self.check_plans()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Image upload
+class AdUploadImageTests(TestCase):
+    def setUp(self) -> None:
+        self.advertisement: Ad = create_ad(create_user(), Category.objects.create(name="Книги"))
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        storage = override_settings(MEDIA_ROOT=os.path.join(directory.name, "media"),
+                                    UPLOAD_STAGING_DIR=os.path.join(directory.name, "uploads"))
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+    def upload(self, content: bytes, **extra):
+        return self.client.post(f"/ad/{self.advertisement.id}/upload_image/",
+                                {"image": SimpleUploadedFile("image.png", content)}, **extra)
+
+    @staticmethod
+    def image(size: tuple[int, int] = (4, 3), image_format: str = "PNG") -> bytes:
+        content = io.BytesIO()
+        Image.new("RGB", size).save(content, format=image_format)
+        return content.getvalue()
+
+    def assertRejected(self, response, status: int, error: str) -> None:
+        self.assertEqual(response.status_code, status)
+        self.assertEqual(response.json(), {"error": error})
+        self.assertFalse(Ad.objects.get().image)
+        self.assertFalse(Job.objects.exists())
+
+    def test_image_is_stored(self):
+        response = self.upload(self.image())
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["image"].endswith(".png"))
+        with Image.open(Ad.objects.get().image.path) as image:
+            self.assertEqual(image.size, (4, 3))
+
+    def test_not_an_image(self):
+        self.assertRejected(self.upload(b"not an image"), 400, "Wrong image")
+
+    def test_malformed_content_length(self):
+        self.assertRejected(self.upload(b"not an image", CONTENT_LENGTH="abc"), 400, "Wrong data")
+
+    @override_settings(AD_IMAGE_MAX_SIZE=1000, AD_IMAGE_FORM_OVERHEAD=100)
+    def test_too_large_request_is_rejected_before_reading(self):
+        with mock.patch("ads.views.limit_image_upload") as limit:
+            self.assertRejected(self.upload(self.image() + b"\0" * 2000), 413, "File is too large")
+        limit.assert_not_called()
+
+    @override_settings(AD_IMAGE_MAX_SIZE=1000, AD_IMAGE_FORM_OVERHEAD=10 ** 6)
+    def test_too_large_file_is_stopped_while_streaming(self):
+        # The request passes the Content-Length check, the file itself goes over the cap
+        self.assertRejected(self.upload(self.image() + b"\0" * 2000), 413, "File is too large")
+        self.assertFalse(os.path.exists(settings.UPLOAD_STAGING_DIR))
+
+    @override_settings(AD_IMAGE_MAX_PIXELS=11)
+    def test_too_many_pixels(self):
+        self.assertRejected(self.upload(self.image((4, 3))), 400, "Wrong image")
+
+    def test_decompression_bomb(self):
+        # Pillow warns over MAX_IMAGE_PIXELS and fails over twice as many, both are rejected
+        for max_pixels in [10, 5]:
+            with self.subTest(max_pixels=max_pixels), mock.patch("PIL.Image.MAX_IMAGE_PIXELS", max_pixels):
+                self.assertRejected(self.upload(self.image((4, 3))), 400, "Wrong image")
+
+    @override_settings(AD_IMAGE_FORMATS=["JPEG"])
+    def test_disallowed_format(self):
+        self.assertRejected(self.upload(self.image()), 400, "Wrong image")
+        self.assertRejected(self.upload(self.image(image_format="BMP")), 400, "Wrong image")
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class StoreImageTests(TransactionTestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self) -> None:
+        self.advertisement: Ad = create_ad(create_user(), Category.objects.create(name="Книги"))
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        storage = override_settings(MEDIA_ROOT=os.path.join(directory.name, "media"))
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+        self.path: str = os.path.join(directory.name, "staged")
+        with open(self.path, "wb") as f:
+            f.write(AdUploadImageTests.image())
+
+    def test_ad_is_read_from_the_primary(self):
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            store_image(ad_id=self.advertisement.id, path=self.path, filename="image.png")
+
+        self.assertEqual(len(replica), 0)
+        self.assertTrue(Ad.objects.get().image)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_missing_ad_fails_and_keeps_the_file(self):
+        with self.assertRaises(Ad.DoesNotExist):
+            store_image(ad_id=self.advertisement.id + 1, path=self.path, filename="image.png")
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_upload_of_a_deleted_ad_is_dropped(self):
+        Ad.all_objects.filter(pk=self.advertisement.pk).update(is_deleted=True)
+
+        store_image(ad_id=self.advertisement.id, path=self.path, filename="image.png")
+        self.assertFalse(Ad.all_objects.get().image)
+        self.assertFalse(os.path.exists(self.path))
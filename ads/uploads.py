@@ -0,0 +1,101 @@
+import os
+import shutil
+import uuid
+import warnings
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload, TemporaryFileUploadHandler
+from django.http import HttpRequest
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Upload limits
+class MaxSizeUploadHandler(FileUploadHandler):
+    """
+    Stop reading an upload as soon as a file grows over max_size
+
+    Comes first in the handlers, so the data of a too large file is neither kept nor written further.
+    The rest of the request body is read and thrown away in chunks
+    """
+
+    def __init__(self, request: HttpRequest, max_size: int) -> None:
+        super().__init__(request)
+        self.max_size = max_size
+        self.too_large: bool = False
+
+    def receive_data_chunk(self, raw_data: bytes, start: int) -> bytes:
+        if start + len(raw_data) > self.max_size:
+            self.too_large = True
+            raise StopUpload(connection_reset=False)
+        return raw_data
+
+    def file_complete(self, file_size: int) -> None:
+        return None
+
+
+def limit_image_upload(request: HttpRequest) -> MaxSizeUploadHandler:
+    """
+    Set the upload handlers of an image endpoint, before request.FILES is read
+
+    Files are capped at AD_IMAGE_MAX_SIZE and always streamed to a temporary file on disk
+    (whatever FILE_UPLOAD_MAX_MEMORY_SIZE is), which stage_upload() then moves instead of copying
+
+    :param request: The incoming request object
+    :return: Size handler, its too_large flag tells whether the upload was stopped
+    """
+    size_handler = MaxSizeUploadHandler(request, settings.AD_IMAGE_MAX_SIZE)
+    request.upload_handlers = [size_handler, TemporaryFileUploadHandler(request)]
+    return size_handler
+
+
+def probe_image(upload: UploadedFile) -> tuple[str, int, int]:
+    """
+    Check the format and the dimensions of an image from its header, the pixels are not decoded
+
+    :param upload: File from request.FILES
+    :return: Format, width and height
+    :raises ValueError: If the file is not an image of AD_IMAGE_FORMATS or has more than AD_IMAGE_MAX_PIXELS
+    """
+    # Pillow is loaded by the first upload, not by every process importing the views
+    from PIL import Image
+
+    upload.seek(0)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            with Image.open(upload, formats=settings.AD_IMAGE_FORMATS) as image:
+                image_format, (width, height) = image.format, image.size
+    except (OSError, SyntaxError, Image.DecompressionBombError, Image.DecompressionBombWarning) as error:
+        raise ValueError(f"Not an image: {error}") from error
+    finally:
+        upload.seek(0)
+
+    if width * height > settings.AD_IMAGE_MAX_PIXELS:
+        raise ValueError(f"Image is too large: {width}x{height}")
+
+    return image_format, width, height
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Staging of uploaded images
+def stage_upload(upload: UploadedFile) -> str:
+    """
+    Keep an uploaded file in the staging directory until a job moves it to the media storage
+
+    Uploads already spooled to disk by Django are moved, not copied
+
+    :param upload: File from request.FILES
+    :return: Path of the staged file
+    """
+    os.makedirs(settings.UPLOAD_STAGING_DIR, exist_ok=True)
+    path: str = os.path.join(settings.UPLOAD_STAGING_DIR, uuid.uuid4().hex)
+
+    if hasattr(upload, "temporary_file_path"):
+        shutil.move(upload.temporary_file_path(), path)
+    else:
+        with open(path, "wb") as f:
+            for chunk in upload.chunks():
+                f.write(chunk)
+
+    return path
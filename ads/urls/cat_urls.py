@@ -1,12 +1,14 @@
 from django.urls import path
 
-from ads.views import CategoryListView, CategoryDetailView, CategoryUpdateView, CategoryDeleteView, CategoryCreateView
+from ads.views import CategoryListView, CategoryDetailView, CategoryUpdateView, CategoryDeleteView, CategoryCreateView, \
+    CategoryStatsView
 
 # ----------------------------------------------------------------------------------------------------------------------
 # Create category urls
 urlpatterns = [
     path('', CategoryListView.as_view()),
     path('create/', CategoryCreateView.as_view()),
+    path('stats/', CategoryStatsView.as_view()),
     path('<int:pk>/', CategoryDetailView.as_view()),
     path('<int:pk>/update/', CategoryUpdateView.as_view()),
     path('<int:pk>/delete/', CategoryDeleteView.as_view()),
@@ -1,17 +1,46 @@
 import json
 from json import JSONDecodeError
 
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.db import router, transaction
 from django.db.models import QuerySet
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import etag
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 
-from Homework_28_PD12 import settings
-from ads.models import Category, Ad
+from Homework_28_PD12.projection import ApiField, get_requested_fields, project_queryset, serialize
+from Homework_28_PD12.ratelimit import ratelimit
+from Homework_28_PD12.versioning import ads_etag, bump_version, categories_etag, category_stats_etag
+from ads.facets import compute_facets, get_facets_cache_key, get_requested_facets
+from ads.models import Category, Ad, CategoryStats
+from ads.purge import tombstone_ads
+from ads.snapshot import snapshot_response
+from ads.uploads import MaxSizeUploadHandler, limit_image_upload, probe_image, stage_upload
+from jobs.models import Job
+from jobs.queue import enqueue
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Advertisement fields available for ?fields= projection
+AD_FIELDS: dict[str, ApiField] = {
+    "id": ApiField(getter=lambda advertisement: advertisement.id),
+    "name": ApiField(getter=lambda advertisement: advertisement.name, only=("name",)),
+    "price": ApiField(getter=lambda advertisement: advertisement.price, only=("price",)),
+    "description": ApiField(getter=lambda advertisement: advertisement.description, only=("description",)),
+    "is_published": ApiField(getter=lambda advertisement: advertisement.is_published, only=("is_published",)),
+    "image": ApiField(getter=lambda advertisement: advertisement.image.url if advertisement.image else None,
+                      only=("image",)),
+    "author": ApiField(getter=lambda advertisement: advertisement.author.username,
+                       only=("author__username",), select_related=("author",)),
+    "category": ApiField(getter=lambda advertisement: advertisement.category.name,
+                         only=("category__name",), select_related=("category",)),
+}
+
+AD_DEFAULT_FIELDS: list[str] = ["name", "price", "description", "image", "author", "category"]
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -28,17 +57,25 @@ def index(request) -> JsonResponse:
 
 # ----------------------------------------------------------------------------------------------------------------------
 # Categories page (CBV)
+@method_decorator(etag(categories_etag), name="get")
 class CategoryListView(ListView):
     model = Category
+    use_snapshot: bool = True
 
     def get(self, request, *args, **kwargs) -> JsonResponse:
         """
         Handle a GET request to the CategoryView
         Returns a list of all Category objects in the database as a JSON response
+        Served from the hot snapshot (see ads/snapshot.py) when it is enabled
 
         :param request: The incoming request object
         :return: A JSON response with a list of dictionaries, where each dictionary represents a Category object
         """
+        if self.use_snapshot and not request.GET:
+            response: HttpResponse | None = snapshot_response(request, "categories")
+            if response is not None:
+                return response
+
         super().get(request, *args, **kwargs)
 
         categories: QuerySet = self.object_list.order_by("name")
@@ -51,6 +88,7 @@ class CategoryListView(ListView):
         return JsonResponse(response, safe=False, json_dumps_params={"ensure_ascii": False}, status=200)
 
 
+@method_decorator(etag(categories_etag), name="get")
 class CategoryDetailView(DetailView):
     model = Category
 
@@ -73,6 +111,39 @@ class CategoryDetailView(DetailView):
         return JsonResponse(response, safe=False, json_dumps_params={"ensure_ascii": False}, status=200)
 
 
+@method_decorator(etag(category_stats_etag), name="get")
+class CategoryStatsView(ListView):
+    model = Category
+
+    def get(self, request, *args, **kwargs) -> JsonResponse:
+        """
+        Handle a GET request to the CategoryStatsView
+        Returns ads statistics of every category from the summary table, the ads table is not queried
+
+        :param request: The incoming request object
+        :return: A JSON response with a list of dictionaries, where each dictionary represents statistics of a category
+        """
+        super().get(request, *args, **kwargs)
+
+        categories: QuerySet = self.object_list.select_related("stats").order_by("name")
+
+        response: list[dict] = []
+        for category in categories:
+            stats: CategoryStats = getattr(category, "stats", None) or CategoryStats(category=category)
+            response.append({
+                "id": category.id,
+                "name": category.name,
+                "total_ads": stats.total_ads,
+                "published_ads": stats.published_ads,
+                "published_ratio": stats.published_ratio,
+                "min_price": stats.min_price,
+                "max_price": stats.max_price,
+                "avg_price": stats.avg_price,
+            })
+
+        return JsonResponse(response, safe=False, json_dumps_params={"ensure_ascii": False}, status=200)
+
+
 @method_decorator(csrf_exempt, name="dispatch")  # Отключение проверки токена
 class CategoryCreateView(CreateView):
     model = Category
@@ -135,44 +206,74 @@ class CategoryDeleteView(DeleteView):
 
     def delete(self, request, *args, **kwargs) -> JsonResponse:
         """
-        Handle a DELETE request to the CategoryView. Delete a Category object in the database
+        Handle a DELETE request to the CategoryView. Mark a Category object as deleted
+        Its ads are tombstoned in the same transaction and the rows removed later in batches
+        by the ads.purge_deleted job
 
         :param request: The incoming request object
         :return: A JSON response with a successful delete status
         """
-        super().delete(request, *args, **kwargs)
+        self.object = self.get_object()
+        using: str = router.db_for_write(Ad)
+        with transaction.atomic(using=using):
+            self.object.is_deleted = True
+            self.object.save(update_fields=["is_deleted"])
+            tombstone_ads(Ad.all_objects.filter(category=self.object), using)
+        bump_version("ads")
+        enqueue("ads.purge_deleted", dedupe=True)
 
         return JsonResponse({"status": "ok"}, status=200)
 
 
 # ----------------------------------------------------------------------------------------------------------------------
 # Advertisements page (CBV)
+@method_decorator(etag(ads_etag), name="get")
 class AdListView(ListView):
     model = Ad
+    use_snapshot: bool = True
+
+    def get_queryset(self) -> QuerySet:
+        """
+        Build the advertisements queryset limited to the requested fields
+
+        :return: Projected queryset ordered by price
+        """
+        return project_queryset(super().get_queryset(), AD_FIELDS, self.requested_fields).order_by("-price")
 
     def get(self, request, *args, **kwargs) -> JsonResponse:
         """
         Handle a GET request to the AdView
         Returns a list of all Ad objects in the database as a JSON response
+        The ?fields= parameter limits the returned (and loaded) fields, e.g. ?fields=id,name,price
+        The ?facets= parameter adds counts per category and price bucket, e.g. ?facets=category,price_buckets
+        The first pages with the default fields are served from the hot snapshot (see ads/snapshot.py) when it is enabled
 
         :param request: The incoming request object
         :return: A JSON response with a list of dictionaries, where each dictionary represents an Ad object
         """
+        if self.use_snapshot and set(request.GET) <= {"page"}:
+            response: HttpResponse | None = snapshot_response(request, f"ads:{request.GET.get('page', '1')}")
+            if response is not None:
+                return response
+
+        try:
+            self.requested_fields: list[str] = get_requested_fields(request, AD_FIELDS, AD_DEFAULT_FIELDS)
+        except ValueError:
+            return JsonResponse({"error": "Wrong fields"}, status=400)
+
+        try:
+            facets: list[str] = get_requested_facets(request)
+        except ValueError:
+            return JsonResponse({"error": "Wrong facets"}, status=400)
+
         super().get(request, *args, **kwargs)
-        advertisements: QuerySet = self.object_list.select_related("author", "category").order_by("-price")
 
-        paginator = Paginator(advertisements, settings.TOTAL_ON_PAGE)
+        paginator = Paginator(self.object_list, settings.TOTAL_ON_PAGE)
         page_number = request.GET.get("page")
         page_obj = paginator.get_page(page_number)
 
-        advertisements_list: list[dict] = [{
-            "name": advertisement.name,
-            "price": advertisement.price,
-            "description": advertisement.description,
-            "image": advertisement.image.url if advertisement.image else None,
-            "author": advertisement.author.username,
-            "category": advertisement.category.name
-        } for advertisement in page_obj]
+        advertisements_list: list[dict] = [serialize(advertisement, AD_FIELDS, self.requested_fields)
+                                           for advertisement in page_obj]
 
         response: dict = {
             "items": advertisements_list,
@@ -180,35 +281,46 @@ class AdListView(ListView):
             "total": paginator.count
         }
 
+        if facets:
+            response["facets"] = compute_facets(self.object_list, facets, get_facets_cache_key(request, "ads"))
+
         return JsonResponse(response, safe=False, json_dumps_params={"ensure_ascii": False}, status=200)
 
 
+@method_decorator(etag(ads_etag), name="get")
 class AdDetailView(DetailView):
     model = Ad
 
+    def get_queryset(self) -> QuerySet:
+        """
+        Build the advertisement queryset limited to the requested fields
+
+        :return: Projected queryset
+        """
+        return project_queryset(super().get_queryset(), AD_FIELDS, self.requested_fields)
+
     def get(self, request, *args, **kwargs) -> JsonResponse:
         """
         Retrieve a single Ad instance
+        The ?fields= parameter limits the returned (and loaded) fields
 
         :param request: The incoming request object
         :return: JSON response with Ad data
         """
+        try:
+            self.requested_fields: list[str] = get_requested_fields(request, AD_FIELDS, AD_DEFAULT_FIELDS)
+        except ValueError:
+            return JsonResponse({"error": "Wrong fields"}, status=400)
+
         super().get(request, *args, **kwargs)
-        advertisement: Ad = get_object_or_404(Ad, pk=kwargs.get("pk"))
 
-        response: dict = {
-            "name": advertisement.name,
-            "price": advertisement.price,
-            "description": advertisement.description,
-            "image": advertisement.image.url if advertisement.image else None,
-            "author": advertisement.author.username,
-            "category": advertisement.category.name
-        }
+        response: dict = serialize(self.object, AD_FIELDS, self.requested_fields)
 
         return JsonResponse(response, safe=False, json_dumps_params={"ensure_ascii": False}, status=200)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
+@method_decorator(ratelimit("ad_create"), name="post")
 class AdCreateView(CreateView):
     model = Ad
     fields: list[dict] = ["name", "price", "description", "image", "author_id", "category_id"]
@@ -282,34 +394,60 @@ class AdDeleteView(DeleteView):
 
     def delete(self, request, *args, **kwargs) -> JsonResponse:
         """
-        Handle a DELETE request to the AdView. Delete an Ad object in the database
+        Handle a DELETE request to the AdView. Mark an Ad object as deleted
+        The row is removed later by the ads.purge_deleted job
 
         :param request: The incoming request object
         :return: A JSON response with a successful delete status
         """
-        super().delete(self, request, *args, **kwargs)
+        self.object = self.get_object()
+        self.object.is_deleted = True
+        self.object.save(update_fields=["is_deleted", "updated_at"])
+        enqueue("ads.purge_deleted", dedupe=True)
         return JsonResponse({"status": "ok"}, status=200)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
+@method_decorator(ratelimit("ad_upload_image"), name="post")
 class AdUploadImage(UpdateView):
     model = Ad
     fields: list[dict] = ["name", "price", "description", "author", "category"]
 
     def post(self, request, *args, **kwargs) -> JsonResponse:
         """
-        Handle a POST request to the AdView. Creates a new image object in the database
+        Handle a POST request to the AdView. Queue a new image of an Ad object
+        Uploads over AD_IMAGE_MAX_SIZE are stopped while streaming, the format and the dimensions
+        are checked from the image header. The file is staged and moved to the media storage by the ads.store_image job
 
         :param request: The incoming request object
-        :return: A JSON response with a dictionary representing the updated Ad object
+        :return: A JSON response with a dictionary representing the Ad object and the id of the job,
+        202 while the job is queued
         """
         self.object = self.get_object()
 
         try:
-            self.object.image = request.FILES.get("image")
-            self.object.save()
-        except Exception:
+            content_length: int = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
             return JsonResponse({"error": "Wrong data"}, status=400)
+        if content_length > settings.AD_IMAGE_MAX_SIZE + settings.AD_IMAGE_FORM_OVERHEAD:
+            return JsonResponse({"error": "File is too large"}, status=413)
+
+        size_handler: MaxSizeUploadHandler = limit_image_upload(request)
+        image = request.FILES.get("image")
+        if size_handler.too_large:
+            return JsonResponse({"error": "File is too large"}, status=413)
+        if image is None:
+            return JsonResponse({"error": "Wrong data"}, status=400)
+
+        try:
+            probe_image(image)
+        except ValueError:
+            return JsonResponse({"error": "Wrong image"}, status=400)
+
+        job: Job = enqueue("ads.store_image", ad_id=self.object.id, path=stage_upload(image),
+                           filename=image.name)
+        if job.status == "done":
+            self.object.refresh_from_db(fields=["image"])
 
         response: dict = {
             "id": self.object.id,
@@ -320,7 +458,9 @@ class AdUploadImage(UpdateView):
             "is_published": self.object.is_published,
             "category_id": self.object.category_id,
             "category": self.object.category.name,
-            "image": self.object.image.url if self.object.image else None
+            "image": self.object.image.url if self.object.image else None,
+            "job_id": job.id,
         }
 
-        return JsonResponse(response, safe=False, json_dumps_params={"ensure_ascii": False}, status=200)
+        return JsonResponse(response, safe=False, json_dumps_params={"ensure_ascii": False},
+                            status=200 if job.status == "done" else 202)
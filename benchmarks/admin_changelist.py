@@ -0,0 +1,81 @@
+"""
+Render time of the Ad admin changelist and change form on a big table
+
+Usage: python -m benchmarks.admin_changelist [--ads 1000000] [--users 10000] [--repeat 5]
+
+Runs on test databases created from the configured DATABASES (DJANGO_SETTINGS_MODULE) and compares
+the project AdAdmin with the ModelAdmin defaults of its tuning options
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.utils import setup_django, test_databases, seed
+
+TUNING_OPTIONS: list[str] = ["list_select_related", "autocomplete_fields", "list_per_page", "show_full_result_count",
+                             "paginator"]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Workload
+def render(client, url: str, repeat: int) -> dict:
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings: list[float] = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            started: float = time.perf_counter()
+            status: int = client.get(url).status_code
+            timings.append((time.perf_counter() - started) * 1000)
+        assert status == 200, status
+
+    return {"median_ms": round(statistics.median(timings), 1), "queries": len(queries)}
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Benchmark
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ads", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib import admin
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import Client
+
+    from ads.models import Ad
+
+    with test_databases():
+        seed(users=args.users, ads=args.ads)
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        client = Client()
+        client.force_login(get_user_model().objects.create_superuser("admin", "admin@example.com", "admin"))
+
+        print(f"{args.ads} ads, {args.users} users")
+        change_url: str = f"/admin/ads/ad/{Ad.objects.values_list('pk', flat=True).first()}/change/"
+        print("AdAdmin changelist:", render(client, "/admin/ads/ad/", args.repeat))
+        print("AdAdmin change form:", render(client, change_url, args.repeat))
+
+        # The admin URLs are bound to the registered instance, so its options are switched in place
+        ad_admin = admin.site._registry[Ad]
+        tuned: dict = {option: getattr(ad_admin, option) for option in TUNING_OPTIONS}
+        for option in TUNING_OPTIONS:
+            setattr(ad_admin, option, getattr(admin.ModelAdmin, option))
+        try:
+            print("default options changelist:", render(client, "/admin/ads/ad/", args.repeat))
+            print("default options change form:", render(client, change_url, args.repeat))
+        finally:
+            for option, value in tuned.items():
+                setattr(ad_admin, option, value)
+
+
+if __name__ == '__main__':
+    main()
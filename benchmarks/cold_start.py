@@ -0,0 +1,65 @@
+"""
+Time to first response of a fresh worker process
+
+Usage: python -m benchmarks.cold_start [--runs 10] [--path /]
+
+For every settings profile starts new interpreters that load the WSGI application
+and serve one request, the time is measured from the process spawn to the end of the response
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES: list[str] = ["Homework_28_PD12.settings", "Homework_28_PD12.settings_api"]
+
+WORKER_CODE = """
+import os, sys, time
+from io import BytesIO
+
+from Homework_28_PD12.wsgi import application
+
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": sys.argv[1], "QUERY_STRING": "", "SERVER_NAME": "localhost",
+    "SERVER_PORT": "80", "HTTP_HOST": "localhost", "wsgi.url_scheme": "http", "wsgi.input": BytesIO(),
+    "wsgi.errors": sys.stderr, "wsgi.version": (1, 0), "wsgi.multithread": False, "wsgi.multiprocess": True,
+    "wsgi.run_once": False,
+}
+status = []
+body = b"".join(application(environ, lambda code, headers, exc_info=None: status.append(code)))
+print(status[0], time.time() - float(os.environ["SPAWNED_AT"]))
+"""
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Benchmark
+def first_response(settings_module: str, path: str) -> tuple[str, float]:
+    env: dict = {**os.environ, "DJANGO_SETTINGS_MODULE": settings_module, "SPAWNED_AT": str(time.time())}
+    result = subprocess.run([sys.executable, "-c", WORKER_CODE, path], cwd=BASE_DIR, env=env, capture_output=True,
+                            text=True)
+    if result.returncode:
+        raise SystemExit(result.stderr)
+    status, elapsed = result.stdout.strip().rsplit(" ", 1)
+    return status, float(elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--path", default="/", help="Requested path, the default one doesn't touch the database")
+    parser.add_argument("--settings", nargs="*", default=PROFILES)
+    args = parser.parse_args()
+
+    for settings_module in args.settings:
+        runs: list[tuple[str, float]] = [first_response(settings_module, args.path) for _ in range(args.runs)]
+        timings: list[float] = [elapsed * 1000 for _, elapsed in runs]
+        print(f"{settings_module}: status {runs[0][0]}, median {statistics.median(timings):.1f} ms, "
+              f"min {min(timings):.1f} ms, max {max(timings):.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
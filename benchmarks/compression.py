@@ -0,0 +1,77 @@
+"""
+Bytes and CPU trade-off of the response compression and of the ETag strategies
+
+Usage: python -m benchmarks.compression [--repeat 50]
+
+The payloads are /ad/ pages built from ads/data/ad.csv, so they contain the same
+long Cyrillic descriptions the API sends with ensure_ascii=False
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+import uuid
+
+from Homework_28_PD12.middleware import COMPRESSORS
+
+ADS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ads', 'data', 'ad.csv')
+
+LEVELS: dict[str, list[int]] = {"gzip": [1, 6, 9], "br": [1, 5, 11], "zstd": [1, 3, 19]}
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Payloads
+def build_page(rows: list[dict], size: int) -> bytes:
+    items: list[dict] = [{
+        "name": row["name"],
+        "price": int(row["price"]),
+        "description": row["description"],
+        "image": f"/media/{row['image']}",
+        "author": f"user_{row['author_id']}",
+        "category": f"category_{row['category_id']}",
+    } for row in (rows * (size // len(rows) + 1))[:size]]
+
+    return json.dumps({"items": items, "num_pages": 1, "total": size}, ensure_ascii=False).encode()
+
+
+def measure(function, repeat: int) -> float:
+    started: float = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Benchmark
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with open(ADS_PATH, encoding="utf-8") as f:
+        rows: list[dict] = list(csv.DictReader(f))
+
+    print(f"{'page':>6} {'encoding':>8} {'level':>5} {'bytes':>9} {'ratio':>6} {'ms':>8}")
+    for size in (10, 100, 1000):
+        payload: bytes = build_page(rows, size)
+        print(f"{size:>6} {'identity':>8} {'-':>5} {len(payload):>9} {1:>6.2f} {0:>8.3f}")
+
+        for encoding, compressor in COMPRESSORS.items():
+            for level in LEVELS[encoding]:
+                compressed: bytes = compressor(payload, level)
+                elapsed: float = measure(lambda: compressor(payload, level), args.repeat)
+                print(f"{size:>6} {encoding:>8} {level:>5} {len(compressed):>9} "
+                      f"{len(payload) / len(compressed):>6.2f} {elapsed:>8.3f}")
+
+        body_etag: float = measure(lambda: hashlib.md5(payload, usedforsecurity=False).hexdigest(), args.repeat)
+        versions: str = "|".join(["/ad/?page=1", *(uuid.uuid4().hex for _ in range(3))])
+        version_etag: float = measure(lambda: hashlib.md5(versions.encode(), usedforsecurity=False).hexdigest(),
+                                      args.repeat)
+        print(f"{size:>6} ETag: body hash {body_etag:.4f} ms (after the page is built), "
+              f"version hash {version_etag:.4f} ms (before any query)")
+
+
+if __name__ == '__main__':
+    main()
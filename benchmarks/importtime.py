@@ -0,0 +1,87 @@
+"""
+Import-time profile of a fresh worker (python -X importtime report)
+
+Usage: python -m benchmarks.importtime [--settings Homework_28_PD12.settings_api] [--top 25] [--output report.json]
+
+Starts a new interpreter that sets up Django and loads the WSGI application,
+then prints the modules with the largest cumulative and self import times
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER_CODE = "from Homework_28_PD12.wsgi import application"
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# -X importtime parsing
+def parse_importtime(stderr: str) -> list[dict]:
+    """
+    Parse the "import time: self [us] | cumulative | imported package" lines
+
+    :param stderr: Standard error of a python -X importtime run
+    :return: One dictionary per imported module
+    """
+    modules: list[dict] = []
+
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+
+    return modules
+
+
+def profile(settings_module: str, code: str = WORKER_CODE) -> list[dict]:
+    """
+    Run the code in a fresh interpreter with -X importtime
+
+    :param settings_module: DJANGO_SETTINGS_MODULE of the worker
+    :param code: Code that loads the application
+    :return: Parsed import times
+    """
+    env: dict = {**os.environ, "DJANGO_SETTINGS_MODULE": settings_module}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BASE_DIR, env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(result.stderr)
+    return parse_importtime(result.stderr)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Report
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--settings", default=os.environ.get("DJANGO_SETTINGS_MODULE", "Homework_28_PD12.settings"))
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--output", help="Write all parsed import times to a JSON file")
+    args = parser.parse_args()
+
+    modules: list[dict] = profile(args.settings)
+    total_us: int = sum(module["cumulative_us"] for module in modules if module["depth"] == 0)
+
+    print(f"{args.settings}: {len(modules)} modules, {total_us / 1000:.1f} ms total import time\n")
+    for key in ("cumulative_us", "self_us"):
+        print(f"Top {args.top} by {key}:")
+        for module in sorted(modules, key=lambda item: item[key], reverse=True)[:args.top]:
+            print(f"{module[key] / 1000:>10.2f} ms  {module['module']}")
+        print()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"settings": args.settings, "total_us": total_us, "modules": modules}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
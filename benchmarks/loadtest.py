@@ -0,0 +1,308 @@
+"""
+HTTP load test of a running server (runserver, gunicorn, uvicorn)
+
+Usage:
+    python -m benchmarks.loadtest prepare [--users 1000] [--ads 10000]
+    python -m benchmarks.loadtest run [--url http://127.0.0.1:8000] [--concurrency 32] [--seconds 30]
+        [--mix browse_list=50,browse_detail=35,create_ad=5,create_user=5,upload_image=5]
+        [--output loadtest.json]
+
+"prepare" migrates and fills the database of DJANGO_SETTINGS_MODULE (see Homework_28_PD12/settings_loadtest.py),
+"run" only needs the standard library: every virtual user is an asyncio task with its own keep-alive
+connection that sends the scenarios in the given ratio. RPS, latency percentiles, error rates and
+status codes per scenario are printed and written to the output file as JSON
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from benchmarks.utils import percentile
+
+DEFAULT_MIX: str = "browse_list=50,browse_detail=35,create_ad=5,create_user=5,upload_image=5"
+
+# Shedding by the rate limits and the admission control, counted apart from the errors
+REJECTED_STATUSES: set[int] = {429, 503}
+
+# 1x1 transparent PNG
+PNG: bytes = bytes.fromhex("89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+                           "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082")
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Minimal HTTP/1.1 client
+class Connection:
+    """
+    Keep-alive connection to the server, reopened after errors and "Connection: close"
+    """
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, body: bytes = b"", content_type: str = "") -> tuple[int, bytes]:
+        """
+        Send a request and read the whole response
+
+        :return: Status code and body
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        headers: list[str] = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                              f"Content-Length: {len(body)}", "Accept-Encoding: identity"]
+        if content_type:
+            headers.append(f"Content-Type: {content_type}")
+        self.writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + body)
+
+        try:
+            await self.writer.drain()
+            status, response_headers = await self._read_head()
+            response_body: bytes = await self._read_body(response_headers)
+        except Exception:
+            await self.close()
+            raise
+
+        if response_headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, response_body
+
+    async def _read_head(self) -> tuple[int, dict[str, str]]:
+        status_line: bytes = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by the server")
+
+        headers: dict[str, str] = {}
+        while (line := await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return int(status_line.split()[1]), headers
+
+    async def _read_body(self, headers: dict[str, str]) -> bytes:
+        if "chunked" in headers.get("transfer-encoding", ""):
+            chunks: list[bytes] = []
+            while size := int((await self.reader.readline()).split(b";")[0], 16):
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            await self.reader.readline()
+            return b"".join(chunks)
+        if "content-length" in headers:
+            return await self.reader.readexactly(int(headers["content-length"]))
+        headers["connection"] = "close"
+        return await self.reader.read()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Scenarios
+class Scenarios:
+    """
+    Requests of the scenarios, built from the ads, users and categories found on the server
+    """
+
+    def __init__(self, ad_ids: list[int], user_ids: list[int], category_ids: list[int], pages: int) -> None:
+        self.ad_ids = ad_ids
+        self.user_ids = user_ids
+        self.category_ids = category_ids
+        self.pages = pages
+
+    @classmethod
+    async def discover(cls, connection: Connection, pages: int) -> "Scenarios":
+        ad_ids: list[int] = []
+        for page in range(1, pages + 1):
+            _, body = await connection.request("GET", f"/ad/?fields=id&page={page}")
+            ad_ids += [ad["id"] for ad in json.loads(body)["items"]]
+        _, body = await connection.request("GET", "/user/?fields=id")
+        user_ids: list[int] = [user["id"] for user in json.loads(body)["items"]]
+        _, body = await connection.request("GET", "/cat/")
+        category_ids: list[int] = [category["id"] for category in json.loads(body)]
+
+        if not ad_ids or not user_ids or not category_ids:
+            raise SystemExit("The server has no ads, users or categories, run the prepare command first")
+        return cls(ad_ids, user_ids, category_ids, pages)
+
+    def browse_list(self) -> tuple:
+        return "GET", f"/ad/?page={random.randint(1, self.pages)}", b"", ""
+
+    def browse_detail(self) -> tuple:
+        return "GET", f"/ad/{random.choice(self.ad_ids)}/", b"", ""
+
+    def create_ad(self) -> tuple:
+        body: dict = {"name": "Нагрузочный тест", "price": random.randint(1, 100_000), "description": "Описание",
+                      "author_id": random.choice(self.user_ids), "category_id": random.choice(self.category_ids)}
+        return "POST", "/ad/create/", json.dumps(body).encode(), "application/json"
+
+    def create_user(self) -> tuple:
+        body: dict = {"username": f"loadtest_{uuid.uuid4().hex[:10]}", "password": "password", "first_name": "Имя",
+                      "last_name": "Фамилия", "role": "member", "age": 30, "locations": ["Москва"]}
+        return "POST", "/user/create/", json.dumps(body).encode(), "application/json"
+
+    def upload_image(self) -> tuple:
+        boundary: str = uuid.uuid4().hex
+        body: bytes = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"image\"; filename=\"loadtest.png\""
+                       f"\r\nContent-Type: image/png\r\n\r\n").encode() + PNG + f"\r\n--{boundary}--\r\n".encode()
+        return "POST", f"/ad/{random.choice(self.ad_ids)}/upload_image/", body, \
+            f"multipart/form-data; boundary={boundary}"
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    """
+    Parse scenario ratios like "browse_list=80,create_ad=20"
+
+    :raises ValueError: If a scenario is unknown or no ratio is positive
+    """
+    ratios: dict[str, float] = {}
+    for item in mix.split(","):
+        name, _, ratio = item.partition("=")
+        name = name.strip()
+        if not hasattr(Scenarios, name) or name.startswith("_") or name == "discover":
+            raise ValueError(f"Unknown scenario: {name}")
+        ratios[name] = float(ratio or 1)
+
+    if sum(ratios.values()) <= 0:
+        raise ValueError("No scenario has a positive ratio")
+    return ratios
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Load
+async def virtual_user(host: str, port: int, scenarios: Scenarios, ratios: dict[str, float], started: float,
+                       warmup: float, deadline: float, results: dict[str, dict]) -> None:
+    connection = Connection(host, port)
+    names: list[str] = list(ratios)
+    weights: list[float] = list(ratios.values())
+
+    while (now := time.perf_counter()) < deadline:
+        name: str = random.choices(names, weights)[0]
+        method, path, body, content_type = getattr(scenarios, name)()
+
+        try:
+            status, _ = await connection.request(method, path, body, content_type)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            status = 0
+        latency: float = (time.perf_counter() - now) * 1000
+
+        if now - started >= warmup:
+            result: dict = results.setdefault(name, {"latencies": [], "statuses": {}})
+            result["latencies"].append(latency)
+            result["statuses"][status] = result["statuses"].get(status, 0) + 1
+
+    await connection.close()
+
+
+def summarize(latencies: list[float], statuses: dict[int, int], seconds: float) -> dict:
+    requests: int = len(latencies)
+    # No connection (0), server errors and unexpected client errors (e.g. 400 on a rejected payload)
+    errors: int = sum(count for status, count in statuses.items()
+                      if status not in REJECTED_STATUSES and (status == 0 or status >= 400))
+    rejected: int = sum(count for status, count in statuses.items() if status in REJECTED_STATUSES)
+    return {
+        "requests": requests,
+        "rps": round(requests / seconds, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p90_ms": round(percentile(latencies, 90), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies, default=float("nan")), 2),
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "rejected_rate": round(rejected / requests, 4) if requests else 0.0,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+async def run(url: str, concurrency: int, seconds: float, warmup: float, ratios: dict[str, float],
+              pages: int) -> dict:
+    address = urlsplit(url)
+    host: str = address.hostname or "127.0.0.1"
+    port: int = address.port or 80
+
+    connection = Connection(host, port)
+    scenarios: Scenarios = await Scenarios.discover(connection, pages)
+    await connection.close()
+
+    results: dict[str, dict] = {}
+    started: float = time.perf_counter()
+    deadline: float = started + warmup + seconds
+    await asyncio.gather(*(virtual_user(host, port, scenarios, ratios, started, warmup, deadline, results)
+                           for _ in range(concurrency)))
+
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    report: dict = {"url": url, "concurrency": concurrency, "seconds": seconds, "mix": ratios, "scenarios": {}}
+    for name, result in sorted(results.items()):
+        report["scenarios"][name] = summarize(result["latencies"], result["statuses"], seconds)
+        latencies += result["latencies"]
+        for status, count in result["statuses"].items():
+            statuses[status] = statuses.get(status, 0) + count
+    report["total"] = summarize(latencies, statuses, seconds)
+
+    return report
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Commands
+def prepare(users: int, ads: int, categories: int) -> None:
+    from benchmarks.utils import setup_django, seed
+
+    setup_django()
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+    seed(users=users, ads=ads, categories=categories)
+    call_command("rebuild_category_stats")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    prepare_parser = commands.add_parser("prepare", help="Migrate and fill the database")
+    prepare_parser.add_argument("--users", type=int, default=1000)
+    prepare_parser.add_argument("--ads", type=int, default=10000)
+    prepare_parser.add_argument("--categories", type=int, default=10)
+
+    run_parser = commands.add_parser("run", help="Load the running server")
+    run_parser.add_argument("--url", default="http://127.0.0.1:8000")
+    run_parser.add_argument("--concurrency", type=int, default=32, help="Virtual users (connections)")
+    run_parser.add_argument("--seconds", type=float, default=30, help="Measured time")
+    run_parser.add_argument("--warmup", type=float, default=3, help="Seconds before the measurement starts")
+    run_parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario ratios")
+    run_parser.add_argument("--pages", type=int, default=10, help="Pages of the ads list to browse")
+    run_parser.add_argument("--output", default="loadtest.json", help="JSON report file")
+
+    args = parser.parse_args()
+
+    if args.command == "prepare":
+        prepare(args.users, args.ads, args.categories)
+        return
+
+    try:
+        ratios: dict[str, float] = parse_mix(args.mix)
+    except ValueError as error:
+        parser.error(str(error))
+
+    report: dict = asyncio.run(run(args.url, args.concurrency, args.seconds, args.warmup, ratios, args.pages))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for name, summary in [*report["scenarios"].items(), ("total", report["total"])]:
+        print(f"{name:<15} {summary['rps']:>8} rps  p50 {summary['p50_ms']:>8} ms  p99 {summary['p99_ms']:>8} ms  "
+              f"errors {summary['error_rate']:.2%}  rejected {summary['rejected_rate']:.2%}")
+    print(f"Report: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Login throughput with the bounded hashing pool and the verified-credential cache
+
+Usage: python -m benchmarks.login [--requests 200] [--threads 8]
+
+Runs on test databases created from the configured DATABASES (DJANGO_SETTINGS_MODULE)
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.utils import setup_django, test_databases, percentile
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Workload
+def login(body: str, clear_cache: bool) -> float:
+    from django.core.cache import caches
+    from django.conf import settings
+    from django.test import Client
+
+    if clear_cache:
+        caches[settings.PASSWORD_VERIFIED_CACHE].clear()
+
+    started: float = time.perf_counter()
+    status: int = Client().post("/user/login/", body, content_type="application/json").status_code
+    assert status == 200, status
+    return (time.perf_counter() - started) * 1000
+
+
+def run(requests: int, threads: int, clear_cache: bool) -> dict:
+    body: str = json.dumps({"username": "bench", "password": "bench-password"})
+
+    started: float = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies: list[float] = list(executor.map(lambda _: login(body, clear_cache), range(requests)))
+    elapsed: float = time.perf_counter() - started
+
+    return {
+        "logins_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Benchmark
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.test import override_settings
+
+    from users.models import User
+    from users.passwords import hash_password
+
+    with test_databases(), override_settings(RATELIMIT_ENABLED=False):
+        User.objects.create(username="bench", password=hash_password("bench-password"), first_name="Имя",
+                            last_name="Фамилия", age=30)
+
+        print(f"PBKDF2 iterations: {settings.PASSWORD_PBKDF2_ITERATIONS}, "
+              f"hashing workers: {settings.PASSWORD_HASHING_WORKERS}")
+        print("key derivation on every login:", run(args.requests, args.threads, clear_cache=True))
+        print("verified-credential cache:", run(args.requests, args.threads, clear_cache=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Peak RSS of a worker handling one image upload
+
+Usage: python -m benchmarks.upload_memory [--output upload_memory.json]
+
+Every case runs in a fresh process on test databases created from the configured DATABASES
+(DJANGO_SETTINGS_MODULE). The multipart body is streamed from a file through the WSGI handler,
+as a server would, and the growth of the peak RSS over a warmed-up process is reported for:
+
+    endpoint  POST /ad/<pk>/upload_image/ (size cap, disk spooling, header probe)
+    defaults  Django's default upload handlers and a full decode of the image (what thumbnails or
+              ImageField dimension fields would do with an unchecked upload)
+"""
+import argparse
+import json
+import os
+import resource
+import struct
+import subprocess
+import sys
+import tempfile
+import uuid
+import zlib
+
+from benchmarks.utils import setup_django, test_databases
+
+MODES: list[str] = ["endpoint", "defaults"]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Payloads
+def write_noise_jpeg(path: str, width: int, height: int) -> None:
+    from PIL import Image
+
+    Image.frombytes("RGB", (width, height), os.urandom(width * height * 3)).save(path, "JPEG", quality=95)
+
+
+def write_png_bomb(path: str, side: int) -> None:
+    # A grayscale PNG of zeros: a few hundred kilobytes on disk, side * side bytes once decoded
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    compressor = zlib.compressobj(9)
+    row: bytes = b"\0" * (side + 1)
+    data: bytes = b"".join(compressor.compress(row) for _ in range(side)) + compressor.flush()
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", side, side, 8, 0, 0, 0, 0))
+                + chunk(b"IDAT", data) + chunk(b"IEND", b""))
+
+
+def write_body(path: str, image_path: str, filename: str) -> str:
+    """
+    Write a multipart/form-data body with the image
+
+    :return: Content type with the boundary
+    """
+    boundary: str = uuid.uuid4().hex
+    with open(path, "wb") as f, open(image_path, "rb") as image:
+        f.write(f"--{boundary}\r\nContent-Disposition: form-data; name=\"image\"; filename=\"{filename}\"\r\n"
+                f"Content-Type: application/octet-stream\r\n\r\n".encode())
+        while chunk := image.read(1024 * 1024):
+            f.write(chunk)
+        f.write(f"\r\n--{boundary}--\r\n".encode())
+    return f"multipart/form-data; boundary={boundary}"
+
+
+def make_cases(directory: str) -> dict[str, tuple[str, str]]:
+    from PIL import Image
+
+    images: dict[str, str] = {
+        "png_small": os.path.join(directory, "small.png"),
+        "jpeg_under_cap": os.path.join(directory, "medium.jpg"),
+        "jpeg_over_cap": os.path.join(directory, "large.jpg"),
+        "png_bomb": os.path.join(directory, "bomb.png"),
+    }
+    Image.new("RGB", (200, 200), "white").save(images["png_small"])
+    write_noise_jpeg(images["jpeg_under_cap"], 1600, 1600)
+    write_noise_jpeg(images["jpeg_over_cap"], 2200, 2200)
+    write_png_bomb(images["png_bomb"], 12_000)
+
+    cases: dict[str, tuple[str, str]] = {}
+    for name, image_path in images.items():
+        body_path: str = f"{image_path}.body"
+        cases[name] = (body_path, write_body(body_path, image_path, os.path.basename(image_path)))
+    return cases
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Child process
+def peak_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def post(handler, path: str, body_path: str, content_type: str) -> int:
+    statuses: list[str] = []
+    with open(body_path, "rb") as body:
+        environ: dict = {
+            "REQUEST_METHOD": "POST", "PATH_INFO": path, "QUERY_STRING": "", "SERVER_NAME": "testserver",
+            "SERVER_PORT": "80", "REMOTE_ADDR": "127.0.0.1", "wsgi.url_scheme": "http", "wsgi.input": body,
+            "CONTENT_TYPE": content_type, "CONTENT_LENGTH": str(os.path.getsize(body_path)),
+        }
+        response = handler(environ, lambda status, headers: statuses.append(status))
+        response.close()
+    return int(statuses[0].split()[0])
+
+
+def defaults(body_path: str, content_type: str) -> int:
+    from PIL import Image
+    from django.core.handlers.wsgi import WSGIRequest
+
+    with open(body_path, "rb") as body:
+        request = WSGIRequest({
+            "REQUEST_METHOD": "POST", "PATH_INFO": "/", "wsgi.input": body, "CONTENT_TYPE": content_type,
+            "CONTENT_LENGTH": str(os.path.getsize(body_path)),
+        })
+        try:
+            with Image.open(request.FILES["image"]) as image:
+                image.load()
+        except Exception:
+            return 400
+    return 200
+
+
+def child(mode: str, body_path: str, content_type: str, warmup_path: str, warmup_type: str) -> None:
+    setup_django()
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+
+    from ads.models import Ad, Category
+    from users.models import User
+
+    with test_databases(), tempfile.TemporaryDirectory() as directory:
+        settings.MEDIA_ROOT = settings.UPLOAD_STAGING_DIR = directory
+        settings.RATELIMIT_ENABLED = False
+        user: User = User.objects.create(username="user", password="password", first_name="Имя",
+                                         last_name="Фамилия", age=30)
+        advertisement: Ad = Ad.objects.create(name="Объявление", author=user, price=1, description="Описание",
+                                              category=Category.objects.create(name="Категория"))
+        path: str = f"/ad/{advertisement.pk}/upload_image/"
+        handler = WSGIHandler()
+
+        if mode == "endpoint":
+            post(handler, path, warmup_path, warmup_type)
+            before: int = peak_rss_kb()
+            status: int = post(handler, path, body_path, content_type)
+        else:
+            defaults(warmup_path, warmup_type)
+            before = peak_rss_kb()
+            status = defaults(body_path, content_type)
+
+        print(json.dumps({"status": status, "peak_rss_growth_kb": peak_rss_kb() - before}))
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Benchmark
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="JSON report file")
+    parser.add_argument("--child", nargs=5, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    report: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cases: dict[str, tuple[str, str]] = make_cases(directory)
+        warmup_path, warmup_type = cases["png_small"]
+
+        for name, (body_path, content_type) in cases.items():
+            report[name] = {"body_kb": os.path.getsize(body_path) // 1024}
+            for mode in MODES:
+                result = subprocess.run([sys.executable, "-m", "benchmarks.upload_memory", "--child", mode, body_path,
+                                         content_type, warmup_path, warmup_type], capture_output=True, text=True)
+                if result.returncode:
+                    raise SystemExit(result.stderr)
+                report[name][mode] = json.loads(result.stdout.strip().splitlines()[-1])
+            print(name, report[name])
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
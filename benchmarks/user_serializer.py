@@ -0,0 +1,109 @@
+"""
+Users list page: prefetched locations and a joined COUNT vs the database-side aggregates of users/serializers.py
+
+Usage: python -m benchmarks.user_serializer [--users 20000] [--ads 100000] [--repeat 20]
+
+Runs on test databases created from the configured DATABASES (DJANGO_SETTINGS_MODULE),
+pages of 10 and 1000 users ordered by username with the default fields and total_ads
+"""
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks.utils import setup_django, test_databases, seed
+
+PAGE_SIZES: list[int] = [10, 1000]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Workload
+def legacy_fields() -> dict:
+    # USER_FIELDS before users/serializers.py: a prefetch query and a GROUP BY over the joined ads
+    from django.db.models import Count, Prefetch, Q
+
+    from Homework_28_PD12.projection import ApiField
+    from users.models import Location
+    from users.serializers import USER_FIELDS
+
+    return {
+        **USER_FIELDS,
+        "locations": ApiField(getter=lambda user: [location.name for location in user.locations.all()],
+                              prefetch_related=(Prefetch("locations", queryset=Location.objects.only("name")),)),
+        "total_ads": ApiField(getter=lambda user: user.total_ads, annotate={
+            "total_ads": Count("ad", filter=Q(ad__is_published=True, ad__is_deleted=False))
+        }),
+    }
+
+
+def render_page(api_fields: dict, page_size: int) -> list[dict]:
+    from Homework_28_PD12.projection import project_queryset, serialize
+    from users.models import User
+    from users.serializers import USER_DEFAULT_FIELDS
+
+    fields: list[str] = USER_DEFAULT_FIELDS + ["total_ads"]
+    queryset = project_queryset(User.objects.all(), api_fields, fields).order_by("username")[:page_size]
+    return [serialize(user, api_fields, fields) for user in queryset]
+
+
+def measure(api_fields: dict, page_size: int, repeat: int) -> dict:
+    from django.db import connections, router
+    from django.test.utils import CaptureQueriesContext
+
+    from users.models import User
+
+    connection = connections[router.db_for_read(User)]
+
+    timings: list[float] = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            started: float = time.perf_counter()
+            render_page(api_fields, page_size)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    return {"median_ms": round(statistics.median(timings), 2), "queries": len(queries)}
+
+
+def seed_locations(locations: int, per_user: int) -> None:
+    from users.models import Location, User
+
+    Location.objects.bulk_create([Location(name=f"Город {i}", lat=55.0, lng=37.0) for i in range(locations)])
+    location_ids: list[int] = list(Location.objects.values_list("id", flat=True))
+
+    through = User.locations.through
+    through.objects.bulk_create([through(user_id=user_id, location_id=location_id)
+                                 for user_id in User.objects.values_list("id", flat=True)
+                                 for location_id in random.sample(location_ids, per_user)], batch_size=5000)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Benchmark
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--ads", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    from users.serializers import USER_FIELDS
+
+    with test_databases():
+        seed(users=args.users, ads=args.ads)
+        seed_locations(locations=100, per_user=2)
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        assert [{**user, "locations": sorted(user["locations"])} for user in render_page(legacy_fields(), 50)] == \
+            [{**user, "locations": sorted(user["locations"])} for user in render_page(USER_FIELDS, 50)]
+
+        for page_size in PAGE_SIZES:
+            print(f"page of {page_size}, prefetch + join:", measure(legacy_fields(), page_size, args.repeat))
+            print(f"page of {page_size}, aggregates:     ", measure(USER_FIELDS, page_size, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
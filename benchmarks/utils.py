@@ -0,0 +1,69 @@
+import os
+import random
+from contextlib import contextmanager
+
+import django
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Helpers shared by the benchmarks that need the Django project
+def setup_django() -> None:
+    """
+    Configure Django (DJANGO_SETTINGS_MODULE or the project settings)
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Homework_28_PD12.settings')
+    django.setup()
+
+
+@contextmanager
+def test_databases():
+    """
+    Run the block on freshly created test databases, like the test runner does
+    """
+    from django.conf import settings
+    from django.test.utils import setup_test_environment, teardown_test_environment, setup_databases, \
+        teardown_databases
+
+    setup_test_environment()
+    settings.ALLOWED_HOSTS = ['*']
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+def seed(users: int, ads: int, categories: int = 10, batch_size: int = 5000) -> None:
+    """
+    Fill the database with generated users, categories and ads (signals are not sent)
+    """
+    from ads.models import Ad, Category
+    from users.models import User
+
+    Category.objects.bulk_create([Category(name=f"Категория {i}") for i in range(categories)])
+    User.objects.bulk_create([User(username=f"user_{i}", password="password", first_name="Имя", last_name="Фамилия",
+                                   age=18 + i % 50) for i in range(users)], batch_size=batch_size)
+
+    category_ids: list[int] = list(Category.objects.values_list("id", flat=True))
+    user_ids: list[int] = list(User.objects.values_list("id", flat=True))
+
+    for start in range(0, ads, batch_size):
+        Ad.objects.bulk_create([Ad(name=f"Объявление {i}", author_id=random.choice(user_ids),
+                                   category_id=random.choice(category_ids), price=random.randint(1, 100_000),
+                                   description="Описание объявления " * 10, is_published=i % 2 == 0,
+                                   image="images/post1.jpg")
+                                for i in range(start, min(start + batch_size, ads))])
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """
+    Nearest-rank percentile
+
+    :param values: Measurements
+    :param percent: Percentile, 0-100
+    """
+    if not values:
+        return float("nan")
+    ordered: list[float] = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))]
@@ -0,0 +1,108 @@
+"""
+Read latency during a write flood, with and without rate limiting/admission control
+
+Usage: python -m benchmarks.write_flood [--seconds 5] [--readers 2] [--writers 16]
+
+Runs on test databases created from the configured DATABASES (DJANGO_SETTINGS_MODULE),
+meant for PostgreSQL: an in-memory SQLite test database locks whole tables on writes
+"""
+import argparse
+import json
+import threading
+import time
+
+from benchmarks.utils import setup_django, test_databases, seed, percentile
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Workload
+def make_client(handler, **defaults):
+    from django.test import Client
+
+    client = Client(**defaults)
+    client.handler = handler
+    return client
+
+
+def read_loop(handler, stop: threading.Event, latencies: list[float], errors: list[int]) -> None:
+    client = make_client(handler)
+    while not stop.is_set():
+        started: float = time.perf_counter()
+        try:
+            ok: bool = client.get("/ad/", {"page": 1}).status_code == 200
+        except Exception:
+            ok = False
+        latencies.append((time.perf_counter() - started) * 1000)
+        errors.append(not ok)
+
+
+def write_loop(handler, stop: threading.Event, number: int, statuses: dict[int, int], lock: threading.Lock) -> None:
+    client = make_client(handler, REMOTE_ADDR=f"10.0.0.{number % 4}")
+    body: str = json.dumps({"name": "Флуд", "price": 1, "description": "Флуд", "author_id": 1, "category_id": 1})
+    while not stop.is_set():
+        try:
+            status: int = client.post("/ad/create/", body, content_type="application/json").status_code
+        except Exception:
+            status = 500
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+
+
+def run(seconds: float, readers: int, writers: int) -> dict:
+    from django.test.client import ClientHandler
+
+    # One middleware chain for all the threads, as in a threaded server process:
+    # the admission slots of WriteConcurrencyLimitMiddleware belong to the middleware instance
+    handler = ClientHandler()
+    handler.load_middleware()
+
+    stop = threading.Event()
+    latencies: list[float] = []
+    errors: list[int] = []
+    statuses: dict[int, int] = {}
+    lock = threading.Lock()
+
+    threads: list[threading.Thread] = [threading.Thread(target=read_loop, args=(handler, stop, latencies, errors))
+                                       for _ in range(readers)]
+    threads += [threading.Thread(target=write_loop, args=(handler, stop, number, statuses, lock))
+                for number in range(writers)]
+
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "reads": len(latencies),
+        "read_p50_ms": round(percentile(latencies, 50), 2),
+        "read_p99_ms": round(percentile(latencies, 99), 2),
+        "read_errors": sum(errors),
+        "write_statuses": statuses,
+    }
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Benchmark
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--writers", type=int, default=16)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import override_settings
+
+    with test_databases():
+        seed(users=100, ads=1000)
+
+        print("reads only:", run(args.seconds, args.readers, 0))
+        print("write flood, limited:", run(args.seconds, args.readers, args.writers))
+        with override_settings(RATELIMIT_ENABLED=False, MAX_CONCURRENT_WRITES=args.writers):
+            print("write flood, unlimited:", run(args.seconds, args.readers, args.writers))
+
+
+if __name__ == '__main__':
+    main()
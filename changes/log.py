@@ -0,0 +1,39 @@
+from django.db import connections, transaction
+
+from changes.models import Change
+
+# Key of the PostgreSQL advisory lock serializing the appends to the change log
+CHANGES_LOCK_ID: int = 0x6368616E676573
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Change log writer
+# The token of a change (its id) must grow in the commit order of the changes: a reader that moved past a token
+# never sees a smaller one appear later. An id taken inside the data transaction doesn't give that, a slow
+# transaction commits its smaller id after a faster one was read. So the rows are appended after the commit
+# of the data, one append at a time: a change is in the feed only once the data it points to is visible
+def _append(changes: list[Change], using: str) -> None:
+    with transaction.atomic(using=using):
+        connection = connections[using]
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [CHANGES_LOCK_ID])
+        # SQLite serializes the writers with the database lock, held from the insert to the commit
+        Change.objects.using(using).bulk_create(changes)
+
+
+def record_changes(model: str, object_ids: list[int], action: str, using: str) -> None:
+    """
+    Append changes to the log once the current transaction commits (right away in autocommit mode)
+
+    A rolled back transaction logs nothing. A crash between the commit of the data and the append
+    loses the changes, the clients resync from a full list then
+
+    :param model: Model label, e.g. "ads.ad"
+    :param object_ids: Ids of the changed objects
+    :param action: "save" or "delete"
+    :param using: Database alias the data was written to
+    """
+    changes: list[Change] = [Change(model=model, object_id=object_id, action=action) for object_id in object_ids]
+    if changes:
+        transaction.on_commit(lambda: _append(changes, using), using=using)
@@ -0,0 +1,22 @@
+from django.db import models
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Create change log model
+class Change(models.Model):
+    """
+    Append-only log of the ads and users changes, the id is the token of the change feed
+    """
+    ACTIONS: list[tuple] = [("save", "Изменение"), ("delete", "Удаление")]
+
+    model: str = models.CharField(max_length=30)
+    object_id: int = models.PositiveBigIntegerField()
+    action: str = models.CharField(max_length=10, choices=ACTIONS)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} {self.action}"
+
+    class Meta:
+        verbose_name: str = "Изменение"
+        verbose_name_plural: str = "Изменения"
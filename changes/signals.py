@@ -0,0 +1,28 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from ads.models import Ad
+from changes.log import record_changes
+from users.models import User
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Change log
+@receiver(post_save, sender=Ad)
+@receiver(post_save, sender=User)
+def log_save(sender, instance, using: str, raw: bool = False, **kwargs) -> None:
+    if raw:
+        return
+
+    action: str = "delete" if instance.is_deleted else "save"
+    record_changes(sender._meta.label_lower, [instance.pk], action, using)
+
+
+@receiver(post_delete, sender=Ad)
+@receiver(post_delete, sender=User)
+def log_delete(sender, instance, using: str, **kwargs) -> None:
+    # A purged tombstone was already logged as deleted
+    if instance.is_deleted:
+        return
+
+    record_changes(sender._meta.label_lower, [instance.pk], "delete", using)
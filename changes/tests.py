@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from ads.models import Ad, Category
+from users.factories import create_user
+from users.models import User
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Change feed
+class ChangeFeedTests(TestCase):
+    def get_feed(self, **params) -> dict:
+        response = self.client.get("/changes/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_pages_through_the_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first: User = create_user("first")
+        with self.captureOnCommitCallbacks(execute=True):
+            second: User = create_user("second")
+        with self.captureOnCommitCallbacks(execute=True):
+            advertisement: Ad = Ad.objects.create(name="Объявление", author=first, price=1, description="Описание",
+                                                  category=Category.objects.create(name="Книги"))
+
+        page: dict = self.get_feed(limit=2)
+        self.assertEqual([(item["model"], item["id"], item["action"]) for item in page["items"]],
+                         [("users.user", first.id, "save"), ("users.user", second.id, "save")])
+        self.assertTrue(page["has_more"])
+
+        page = self.get_feed(since=page["next"], limit=2)
+        self.assertEqual([(item["model"], item["id"]) for item in page["items"]], [("ads.ad", advertisement.id)])
+        self.assertFalse(page["has_more"])
+
+        self.assertEqual(self.get_feed(since=page["next"]), {"items": [], "next": page["next"], "has_more": False})
+
+    def test_soft_delete_is_logged_as_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user: User = create_user("user")
+            user.is_deleted = True
+            user.save()
+
+        self.assertEqual([item["action"] for item in self.get_feed()["items"]], ["save", "delete"])
+
+    def test_rolled_back_changes_are_not_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    create_user("user")
+                    raise ValueError
+            except ValueError:
+                pass
+
+        self.assertEqual(self.get_feed()["items"], [])
+
+    def test_slow_transaction_is_not_skipped(self):
+        # The slow transaction writes first but commits after a faster one: the cursor handed out
+        # after the fast commit must still lead to the slow change
+        with self.captureOnCommitCallbacks() as slow_commit:
+            slow: User = create_user("slow")
+        with self.captureOnCommitCallbacks(execute=True):
+            fast: User = create_user("fast")
+        self.assertLess(slow.id, fast.id)
+
+        page: dict = self.get_feed()
+        self.assertEqual([item["id"] for item in page["items"]], [fast.id])
+
+        for callback in slow_commit:
+            callback()
+
+        self.assertEqual([item["id"] for item in self.get_feed(since=page["next"])["items"]], [slow.id])
+
+    @override_settings(CHANGES_POLL_INTERVAL=0.01)
+    def test_long_poll_without_changes(self):
+        self.assertEqual(self.get_feed(since=0, wait=0.05)["items"], [])
+
+    def test_wrong_parameters(self):
+        self.assertEqual(self.client.get("/changes/", {"since": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get("/changes/", {"wait": "soon"}).status_code, 400)
+
+    def test_limit_must_be_positive(self):
+        # limit=0 would answer has_more with the same token forever, a negative one can't slice the queryset
+        self.assertEqual(self.client.get("/changes/", {"limit": 0}).status_code, 400)
+        self.assertEqual(self.client.get("/changes/", {"limit": -1}).status_code, 400)
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from changes.views import ChangeListView
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Create change feed urls
+urlpatterns = [
+    path('', ChangeListView.as_view()),
+]
@@ -0,0 +1,68 @@
+import time
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.http import JsonResponse
+from django.views.generic import ListView
+
+from changes.models import Change
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Change feed page (CBV)
+class ChangeListView(ListView):
+    model = Change
+
+    def get_changes(self, since: int, limit: int) -> list[Change]:
+        """
+        Get the changes after the token
+
+        The tokens are handed out in the commit order of the changes (see changes/log.py),
+        so every change is visible as soon as it is logged
+
+        :param since: Token of the last change seen by the client
+        :param limit: Batch size
+        :return: Changes ordered by token
+        """
+        changes: QuerySet = self.object_list.filter(id__gt=since).order_by("id")
+        return list(changes[:limit])
+
+    def get(self, request, *args, **kwargs) -> JsonResponse:
+        """
+        Handle a GET request to the ChangeView
+        Returns the ads and users changed after the ?since= token, in batches of ?limit= changes
+        With ?wait=<seconds> the request is held until a change appears or the time is over (long poll)
+
+        :param request: The incoming request object
+        :return: A JSON response with the changes and the token to continue from
+        """
+        try:
+            since: int = int(request.GET.get("since", 0))
+            limit: int = min(int(request.GET.get("limit", settings.CHANGES_BATCH_SIZE)), settings.CHANGES_BATCH_SIZE)
+            wait: float = min(float(request.GET.get("wait", 0)), settings.CHANGES_MAX_WAIT)
+            if limit < 1:
+                raise ValueError(f"Limit must be positive: {limit}")
+        except ValueError:
+            return JsonResponse({"error": "Wrong data"}, status=400)
+
+        super().get(request, *args, **kwargs)
+
+        deadline: float = time.monotonic() + wait
+        changes: list[Change] = self.get_changes(since, limit)
+        while not changes and time.monotonic() < deadline:
+            time.sleep(settings.CHANGES_POLL_INTERVAL)
+            changes = self.get_changes(since, limit)
+
+        response: dict = {
+            "items": [{
+                "token": change.id,
+                "model": change.model,
+                "id": change.object_id,
+                "action": change.action,
+                "changed_at": change.changed_at,
+            } for change in changes],
+            "next": changes[-1].id if changes else since,
+            "has_more": len(changes) == limit,
+        }
+
+        return JsonResponse(response, safe=False, status=200)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Max, Q
+
+from jobs.models import Job
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Job timing metrics
+class Command(BaseCommand):
+    help = "Show the number of jobs by status and their run times per task"
+
+    def handle(self, *args, **options) -> None:
+        rows: list[dict] = list(Job.objects.order_by("task").values("task").annotate(
+            queued=Count("id", filter=Q(status="queued")),
+            running=Count("id", filter=Q(status="running")),
+            done=Count("id", filter=Q(status="done")),
+            failed=Count("id", filter=Q(status="failed")),
+            avg_duration=Avg("duration", filter=Q(status="done")),
+            max_duration=Max("duration", filter=Q(status="done")),
+        ))
+
+        self.stdout.write(f"{'task':<30} {'queued':>7} {'running':>7} {'done':>7} {'failed':>7} "
+                          f"{'avg, s':>8} {'max, s':>8}")
+        for row in rows:
+            self.stdout.write(f"{row['task']:<30} {row['queued']:>7} {row['running']:>7} {row['done']:>7} "
+                              f"{row['failed']:>7} {row['avg_duration'] or 0:>8.3f} {row['max_duration'] or 0:>8.3f}")
@@ -0,0 +1,81 @@
+import multiprocessing
+import signal
+import threading
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _process_main(threads: int, poll_interval: float, once: bool) -> None:
+    # A spawned process starts with a fresh interpreter: the apps (and the tasks they register) are loaded here,
+    # DJANGO_SETTINGS_MODULE is inherited from the environment of the command
+    if not apps.ready:
+        django.setup()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    _run_threads(threads, stop, poll_interval, once)
+
+
+def _run_threads(threads: int, stop: threading.Event, poll_interval: float, once: bool) -> None:
+    from jobs.queue import work
+
+    workers: list[threading.Thread] = [
+        threading.Thread(target=work, args=(stop, poll_interval, once), name=f"job-worker-{number}", daemon=True)
+        for number in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        while worker.is_alive():
+            worker.join(timeout=0.5)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Run job workers
+class Command(BaseCommand):
+    help = "Run the workers of the background job queue"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--processes", type=int, default=settings.JOBS_WORKER_PROCESSES,
+                            help="Worker processes (0 runs the threads in this process)")
+        parser.add_argument("--threads", type=int, default=settings.JOBS_WORKER_THREADS,
+                            help="Worker threads per process")
+        parser.add_argument("--poll-interval", type=float, default=settings.JOBS_POLL_INTERVAL,
+                            help="Seconds to wait when the queue is empty")
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+
+    def handle(self, *args, **options) -> None:
+        threads, poll_interval, once = options["threads"], options["poll_interval"], options["once"]
+        self.stdout.write(f"Starting {max(options['processes'], 1)} process(es) x {threads} thread(s)")
+
+        if options["processes"] <= 0:
+            stop = threading.Event()
+            try:
+                _run_threads(threads, stop, poll_interval, once)
+            except KeyboardInterrupt:
+                stop.set()
+            return
+
+        # Spawned, not forked: a fork copies the open database connections, the locks held by other threads
+        # and isn't available everywhere. The connections are closed anyway, nothing is inherited by accident
+        connections.close_all()
+        context = multiprocessing.get_context("spawn")
+        processes: list[multiprocessing.Process] = [
+            context.Process(target=_process_main, args=(threads, poll_interval, once), name=f"jobs-{number}")
+            for number in range(options["processes"])
+        ]
+        for process in processes:
+            process.start()
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
@@ -0,0 +1,32 @@
+from django.db import models
+from django.utils import timezone
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Create job model
+class Job(models.Model):
+    """
+    Background job of the local queue (see jobs/queue.py)
+    """
+    STATUSES: list[tuple] = [("queued", "В очереди"), ("running", "Выполняется"), ("done", "Выполнено"),
+                             ("failed", "Ошибка")]
+
+    task: str = models.CharField(max_length=100)
+    payload: dict = models.JSONField(default=dict)
+    status: str = models.CharField(max_length=10, choices=STATUSES, default="queued")
+    attempts: int = models.PositiveIntegerField(default=0)
+    max_attempts: int = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error: str = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration: float = models.FloatField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.task} #{self.id}"
+
+    class Meta:
+        verbose_name: str = "Задача"
+        verbose_name_plural: str = "Задачи"
+        indexes: list = [models.Index(fields=["status", "run_after"])]
@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+import traceback
+from datetime import timedelta
+from typing import Callable
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, close_old_connections, connections, transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from jobs.models import Job
+
+logger = logging.getLogger("jobs")
+
+TASKS: dict[str, Callable] = {}
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Tasks
+def task(name: str):
+    """
+    Register a function as a job task
+
+    :param name: Task name used by enqueue()
+    """
+    def decorator(function: Callable) -> Callable:
+        TASKS[name] = function
+        return function
+    return decorator
+
+
+def enqueue(name: str, dedupe: bool = False, **payload) -> Job:
+    """
+    Put a job to the queue, with JOBS_EAGER it is run right away
+
+    :param name: Registered task name
+    :param dedupe: Don't add the job if the same one is already waiting
+    :param payload: JSON serializable keyword arguments of the task
+    :return: The queued job
+    """
+    if name not in TASKS:
+        raise KeyError(f"Unknown task: {name}")
+
+    if dedupe:
+        queued: Job | None = Job.objects.filter(task=name, payload=payload, status="queued").first()
+        if queued is not None:
+            return queued
+
+    job: Job = Job.objects.create(task=name, payload=payload, max_attempts=settings.JOBS_MAX_ATTEMPTS)
+
+    if settings.JOBS_EAGER:
+        job.status, job.attempts, job.started_at = "running", 1, timezone.now()
+        run_job(job)
+
+    return job
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Worker side
+def claim_job(using: str = DEFAULT_DB_ALIAS) -> Job | None:
+    """
+    Take the next due job and mark it as running
+
+    PostgreSQL skips the rows locked by other workers (SELECT ... FOR UPDATE SKIP LOCKED),
+    on SQLite, where writes are serialized anyway, the job is taken by a conditional UPDATE.
+    Jobs running for longer than JOBS_TIMEOUT are treated as abandoned by a dead worker and taken again
+
+    :param using: Database alias of the queue
+    :return: Claimed job or None if nothing is due
+    """
+    now = timezone.now()
+    due: QuerySet = Job.objects.using(using).filter(
+        Q(status="queued", run_after__lte=now)
+        | Q(status="running", started_at__lt=now - timedelta(seconds=settings.JOBS_TIMEOUT))
+    ).order_by("run_after", "id")
+
+    with transaction.atomic(using=using):
+        if connections[using].features.has_select_for_update_skip_locked:
+            job: Job | None = due.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+        else:
+            job = due.first()
+            if job is None:
+                return None
+            claimed: int = Job.objects.using(using).filter(pk=job.pk, status=job.status, started_at=job.started_at) \
+                .update(status="running", started_at=now)
+            if not claimed:
+                return None
+
+        job.status, job.started_at, job.attempts = "running", now, job.attempts + 1
+        job.save(using=using, update_fields=["status", "started_at", "attempts"])
+
+    return job
+
+
+def run_job(job: Job) -> None:
+    """
+    Run a claimed job and store its result, failed jobs are retried with exponential backoff
+
+    :param job: Job returned by claim_job()
+    """
+    started: float = time.perf_counter()
+    try:
+        TASKS[job.task](**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            delay: float = min(settings.JOBS_RETRY_BACKOFF * 2 ** (job.attempts - 1), settings.JOBS_RETRY_BACKOFF_MAX)
+            job.status, job.run_after = "queued", timezone.now() + timedelta(seconds=delay)
+        else:
+            job.status = "failed"
+        logger.exception("Job %s failed (attempt %s of %s)", job, job.attempts, job.max_attempts)
+    else:
+        job.status = "done"
+
+    job.duration = time.perf_counter() - started
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "attempts", "started_at", "run_after", "last_error", "duration", "finished_at"])
+    logger.info("Job %s: %s in %.3f s", job, job.status, job.duration)
+
+
+def work(stop: threading.Event, poll_interval: float, once: bool = False, using: str = DEFAULT_DB_ALIAS) -> int:
+    """
+    Run jobs until stopped
+
+    :param stop: Event that stops the loop
+    :param poll_interval: Seconds to wait when the queue is empty
+    :param once: Exit when the queue is empty
+    :param using: Database alias of the queue
+    :return: Number of processed jobs
+    """
+    processed: int = 0
+
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            job: Job | None = claim_job(using)
+        except DatabaseError:
+            # A busy (e.g. locked SQLite) database must not kill the worker thread
+            logger.exception("Can't claim a job")
+            stop.wait(poll_interval)
+            continue
+
+        if job is None:
+            if once:
+                break
+            stop.wait(poll_interval)
+            continue
+
+        run_job(job)
+        processed += 1
+
+    connections.close_all()
+    return processed
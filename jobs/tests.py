@@ -0,0 +1,115 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import TASKS, claim_job, enqueue, run_job
+
+calls: list[dict] = []
+
+
+def record(**payload) -> None:
+    calls.append(payload)
+
+
+def fail(**payload) -> None:
+    raise RuntimeError("Task failed")
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Job queue
+@override_settings(JOBS_EAGER=False, JOBS_MAX_ATTEMPTS=3, JOBS_RETRY_BACKOFF=5, JOBS_RETRY_BACKOFF_MAX=8,
+                   JOBS_TIMEOUT=60)
+class JobQueueTests(TestCase):
+    def setUp(self) -> None:
+        calls.clear()
+        patcher = mock.patch.dict(TASKS, {"tests.record": record, "tests.fail": fail})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unknown_task(self):
+        with self.assertRaises(KeyError):
+            enqueue("tests.unknown")
+
+    def test_dedupe(self):
+        first: Job = enqueue("tests.record", dedupe=True, value=1)
+        self.assertEqual(enqueue("tests.record", dedupe=True, value=1), first)
+        self.assertNotEqual(enqueue("tests.record", dedupe=True, value=2), first)
+        self.assertNotEqual(enqueue("tests.record", value=1), first)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager(self):
+        job: Job = enqueue("tests.record", value=1)
+        self.assertEqual(calls, [{"value": 1}])
+        self.assertEqual(Job.objects.get(pk=job.pk).status, "done")
+
+    def test_claim_takes_the_oldest_due_job_once(self):
+        later: Job = enqueue("tests.record", value=2)
+        first: Job = enqueue("tests.record", value=1)
+        Job.objects.filter(pk=later.pk).update(run_after=timezone.now() + timedelta(seconds=30))
+
+        job: Job = claim_job()
+        self.assertEqual((job.pk, job.status, job.attempts), (first.pk, "running", 1))
+        self.assertIsNone(claim_job())
+
+    def test_abandoned_job_is_claimed_again(self):
+        job: Job = enqueue("tests.record")
+        claim_job()
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(seconds=61))
+
+        job = claim_job()
+        self.assertEqual((job.status, job.attempts), ("running", 2))
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job: Job = enqueue("tests.fail")
+        delays: list[float] = []
+
+        with self.assertLogs("jobs", level="ERROR") as logs:
+            while job := claim_job():
+                started = timezone.now()
+                run_job(job)
+                job.refresh_from_db()
+                if job.status == "queued":
+                    delays.append(round((job.run_after - started).total_seconds()))
+                    Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertEqual(len(logs.records), 3)
+
+        job = Job.objects.get()
+        self.assertEqual(delays, [5, 8])
+        self.assertEqual((job.status, job.attempts), ("failed", 3))
+        self.assertIn("RuntimeError: Task failed", job.last_error)
+
+    def test_successful_job(self):
+        enqueue("tests.record", value=1)
+        job: Job = claim_job()
+        run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+        self.assertIsNotNone(job.duration)
+        self.assertEqual(calls, [{"value": 1}])
+
+
+@override_settings(JOBS_EAGER=False)
+class RunWorkersTests(TransactionTestCase):
+    def setUp(self) -> None:
+        calls.clear()
+        patcher = mock.patch.dict(TASKS, {"tests.record": record})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_worker_threads_run_the_queue(self):
+        for value in range(5):
+            enqueue("tests.record", value=value)
+
+        # Threads of the shared in-memory SQLite test database lock each other's tables ("Can't claim a job")
+        threads: int = 1 if connection.vendor == "sqlite" else 2
+        call_command("run_workers", processes=0, threads=threads, poll_interval=0.01, once=True, stdout=StringIO())
+
+        self.assertEqual(sorted(call["value"] for call in calls), list(range(5)))
+        self.assertEqual(set(Job.objects.values_list("status", flat=True)), {"done"})
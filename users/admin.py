@@ -1,8 +1,27 @@
 from django.contrib import admin
 
+from Homework_28_PD12.paginator import EstimatedCountPaginator
 from users.models import Location, User
 
+
 # ----------------------------------------------------------------------------------------------------------------------
 # Register models
-admin.site.register(Location)
-admin.site.register(User)
+@admin.register(Location)
+class LocationAdmin(admin.ModelAdmin):
+    list_display: tuple[str, ...] = ("id", "name", "lat", "lng")
+    search_fields: tuple[str, ...] = ("name",)
+    list_per_page: int = 50
+    show_full_result_count: bool = False
+    paginator = EstimatedCountPaginator
+
+
+@admin.register(User)
+class UserAdmin(admin.ModelAdmin):
+    list_display: tuple[str, ...] = ("id", "username", "first_name", "last_name", "role", "age")
+    list_filter: tuple[str, ...] = ("role",)
+    search_fields: tuple[str, ...] = ("username",)
+    autocomplete_fields: tuple[str, ...] = ("locations",)
+    exclude: tuple[str, ...] = ("password",)
+    list_per_page: int = 50
+    show_full_result_count: bool = False
+    paginator = EstimatedCountPaginator
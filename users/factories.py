@@ -0,0 +1,8 @@
+from users.models import User
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Test data shared by the test modules of the apps
+def create_user(username: str = "user", password: str = "password", **kwargs) -> User:
+    return User.objects.create(username=username, password=password, first_name="Имя", last_name="Фамилия", age=30,
+                               **kwargs)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from users.passwords import hash_plaintext_passwords
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Hash plain text passwords
+class Command(BaseCommand):
+    help = "Hash the passwords stored in plain text (run once after Homework_28_PD12/import_csv.py)"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000, help="Users loaded at once")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Primary database alias")
+
+    def handle(self, *args, **options) -> None:
+        hashed: int = hash_plaintext_passwords(options["batch_size"], options["database"])
+        self.stdout.write(self.style.SUCCESS(f"Hashed {hashed} passwords"))
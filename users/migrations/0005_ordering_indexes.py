@@ -0,0 +1,17 @@
+# Generated by Django 4.1.13 on 2026-10-19 15:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_password_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['username'], name='users_user_usernam_65d164_idx'),
+        ),
+    ]
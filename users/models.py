@@ -1,5 +1,7 @@
 from django.db import models
 
+from Homework_28_PD12.managers import SoftDeleteManager
+
 
 # ----------------------------------------------------------------------------------------------------------------------
 # Create location model
@@ -24,10 +26,16 @@ class User(models.Model):
     first_name: str = models.CharField(max_length=20)
     last_name: str = models.CharField(max_length=20)
     username: str = models.CharField(max_length=20)
-    password: str = models.CharField(max_length=20)
+    password: str = models.CharField(max_length=128)
     role: str = models.CharField(max_length=20, choices=ROLE, default="member")
     age: int = models.PositiveIntegerField()
     locations = models.ManyToManyField(Location)
+    is_deleted: bool = models.BooleanField(default=False, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.username
@@ -35,3 +43,4 @@ class User(models.Model):
     class Meta:
         verbose_name: str = "Пользователь"
         verbose_name_plural: str = "Пользователи"
+        indexes: list = [models.Index(fields=["username"])]
@@ -0,0 +1,157 @@
+import hashlib
+import hmac
+import threading
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, identify_hasher, make_password
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+
+from users.models import User
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Hasher
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 hasher with the number of iterations taken from PASSWORD_PBKDF2_ITERATIONS
+
+    Hashes with another number of iterations are upgraded on the next successful login
+    """
+
+    @property
+    def iterations(self) -> int:
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Bounded hashing pool
+# The key derivation runs in at most PASSWORD_HASHING_WORKERS threads (hashlib releases the GIL),
+# so a burst of logins or sign-ups can't take all the CPU of the worker
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASHING_WORKERS,
+                                           thread_name_prefix="password-hashing")
+    return _executor
+
+
+def _run(function, *args):
+    try:
+        return _get_executor().submit(function, *args).result(timeout=settings.PASSWORD_HASHING_TIMEOUT)
+    except futures.TimeoutError:
+        # The same class as the builtin TimeoutError only since Python 3.11
+        raise TimeoutError("The password hashing pool is busy") from None
+
+
+def hash_password(raw_password: str) -> str:
+    """
+    Hash a password in the hashing pool
+
+    :param raw_password: Password given by the user
+    :return: Encoded password for User.password
+    :raises TimeoutError: If the pool is too busy
+    """
+    return _run(make_password, raw_password)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Verification
+def _is_hashed(encoded: str) -> bool:
+    try:
+        identify_hasher(encoded)
+    except ValueError:
+        return False
+    return True
+
+
+def _cache_key(user: User, raw_password: str) -> str:
+    # The encoded password is a part of the key: a new password or an upgraded hash invalidates the entry
+    message: str = f"{user.pk}:{user.password}:{raw_password}"
+    digest: str = hmac.new(settings.SECRET_KEY.encode(), message.encode(), hashlib.sha256).hexdigest()
+    return f"verified-password:{digest}"
+
+
+def verify_password(user: User, raw_password: str) -> bool:
+    """
+    Check the password of the user
+
+    Successful checks are cached for PASSWORD_VERIFIED_CACHE_TTL seconds, so repeated requests
+    of the same client don't run the key derivation again. Passwords stored in plain text
+    (imported from CSV) or hashed with outdated parameters are rehashed on success
+
+    :param user: User loaded from the database
+    :param raw_password: Password given by the client
+    :return: True if the password is correct
+    """
+    cache = caches[settings.PASSWORD_VERIFIED_CACHE]
+    key: str = _cache_key(user, raw_password)
+    if cache.get(key):
+        return True
+
+    must_update: list[bool] = []
+    if _is_hashed(user.password):
+        is_correct: bool = _run(check_password, raw_password, user.password, lambda _: must_update.append(True))
+    else:
+        is_correct = constant_time_compare(raw_password, user.password)
+        must_update.append(is_correct)
+
+    if not is_correct:
+        return False
+
+    if must_update:
+        user.password = hash_password(raw_password)
+        user.save(update_fields=["password", "updated_at"])
+
+    cache.set(_cache_key(user, raw_password), True, timeout=settings.PASSWORD_VERIFIED_CACHE_TTL)
+    return True
+
+
+def reject_unknown_user(raw_password: str) -> bool:
+    """
+    Spend the time of a password check on a login with an unknown username, as ModelBackend does,
+    so the response time doesn't tell which usernames exist
+
+    :param raw_password: Password given by the client
+    :return: Always False
+    :raises TimeoutError: If the pool is too busy
+    """
+    hash_password(raw_password)
+    return False
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Plain text passwords
+def hash_plaintext_passwords(batch_size: int, using: str) -> int:
+    """
+    Hash the passwords stored in plain text (imported from CSV) without waiting for the next login
+
+    A password changed meanwhile is left as is. The password is not a part of any response,
+    so the data versions are not bumped
+
+    :param batch_size: Number of users loaded at once
+    :param using: Database alias of the primary
+    :return: Number of hashed passwords
+    """
+    hashed: int = 0
+    last_pk: int = 0
+
+    while True:
+        users: list[User] = list(User.all_objects.using(using).filter(pk__gt=last_pk).order_by("pk")
+                                 .only("pk", "password")[:batch_size])
+        if not users:
+            return hashed
+
+        for user in users:
+            if not _is_hashed(user.password):
+                hashed += User.all_objects.using(using).filter(pk=user.pk, password=user.password) \
+                    .update(password=make_password(user.password))
+        last_pk = users[-1].pk
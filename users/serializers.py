@@ -0,0 +1,125 @@
+import json
+
+from django.db import NotSupportedError, models
+from django.db.models import Aggregate, Count, IntegerField, OuterRef, Q, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from Homework_28_PD12.projection import ApiField, project_queryset, serialize
+from ads.models import Ad
+from users.models import User
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Database-side aggregates
+class NameListField(models.Field):
+    """
+    Output field of a list of names built by the database: a PostgreSQL array or the JSON text of SQLite
+
+    Set on the outermost expression, whose value is converted on load
+    """
+
+    def from_db_value(self, value, expression, connection) -> list[str]:
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return json.loads(value)
+        return list(value)
+
+    def get_db_prep_value(self, value, connection, prepared: bool = False):
+        # A literal list (the empty default of Coalesce) in the type the aggregate returns
+        if connection.vendor == "postgresql":
+            return list(value)
+        return json.dumps(value, ensure_ascii=False)
+
+
+class LocationNames(Aggregate):
+    """
+    Names of the locations as a list, aggregated by the database
+
+    ARRAY_AGG on PostgreSQL, JSON_GROUP_ARRAY on SQLite (GROUP_CONCAT with JSON quoting,
+    so names with commas survive)
+    """
+    name: str = "LocationNames"
+    output_field = NameListField()
+
+    def __init__(self, expression: str, **extra) -> None:
+        super().__init__(expression, filter=Q(**{f"{expression}__isnull": False}), **extra)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function="ARRAY_AGG", **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function="JSON_GROUP_ARRAY", **extra_context)
+
+    def as_sql(self, compiler, connection, function: str | None = None, **extra_context):
+        if function is None:
+            raise NotSupportedError(f"LocationNames is not supported on {connection.vendor}")
+        return super().as_sql(compiler, connection, function=function, **extra_context)
+
+
+def location_names() -> Coalesce:
+    # A correlated subquery per user instead of a GROUP BY of the users: ORDER BY ... LIMIT of the list
+    # keeps its index scan and the aggregate runs only for the rows of the page.
+    # A user without locations has no group at all (NULL), hence the empty list default
+    through = User.locations.through
+    return Coalesce(Subquery(through.objects.filter(user=OuterRef("pk")).order_by().values("user")
+                             .annotate(names=LocationNames("location__name")).values("names"),
+                             output_field=NameListField()),
+                    Value([], output_field=NameListField()))
+
+
+def total_ads() -> Coalesce:
+    return Coalesce(Subquery(Ad.all_objects.filter(author=OuterRef("pk"), is_published=True, is_deleted=False)
+                             .order_by().values("author").annotate(count=Count("pk")).values("count"),
+                             output_field=IntegerField()), 0)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# User fields available for ?fields= projection
+USER_FIELDS: dict[str, ApiField] = {
+    "id": ApiField(getter=lambda user: user.id),
+    "username": ApiField(getter=lambda user: user.username, only=("username",)),
+    "first_name": ApiField(getter=lambda user: user.first_name, only=("first_name",)),
+    "last_name": ApiField(getter=lambda user: user.last_name, only=("last_name",)),
+    "role": ApiField(getter=lambda user: user.role, only=("role",)),
+    "age": ApiField(getter=lambda user: user.age, only=("age",)),
+    "locations": ApiField(getter=lambda user: user.location_names, annotate={"location_names": location_names()}),
+    "total_ads": ApiField(getter=lambda user: user.total_ads, annotate={"total_ads": total_ads()}),
+}
+
+USER_DEFAULT_FIELDS: list[str] = ["username", "first_name", "last_name", "role", "age", "locations"]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Serializer
+def user_queryset(queryset: QuerySet, fields: list[str]) -> QuerySet:
+    """
+    Load only what the requested fields need, locations and ads counts included, in one query
+
+    :param queryset: Base users queryset
+    :param fields: Requested field names
+    :return: Projected queryset
+    """
+    return project_queryset(queryset, USER_FIELDS, fields)
+
+
+def serialize_user(user: User, fields: list[str]) -> dict:
+    """
+    Build the output dictionary of a user loaded by user_queryset()
+
+    :param user: User instance
+    :param fields: Requested field names
+    :return: Dictionary field name -> value
+    """
+    return serialize(user, USER_FIELDS, fields)
+
+
+def load_user(pk: int, fields: list[str] = USER_DEFAULT_FIELDS) -> dict:
+    """
+    Load and serialize a user after a write, instead of querying the locations separately
+
+    :param pk: User id
+    :param fields: Requested field names
+    :return: Dictionary field name -> value
+    """
+    return serialize_user(user_queryset(User.objects.all(), fields).get(pk=pk), fields)
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from Homework_28_PD12.versioning import bump_version
+from users.models import User, Location
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Data versions
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=Location)
+@receiver(m2m_changed, sender=User.locations.through)
+def user_changed(sender, **kwargs) -> None:
+    bump_version("users")
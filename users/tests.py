@@ -1,3 +1,121 @@
-from django.test import TestCase
+import json
+import time
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from users import passwords
+from users.factories import create_user
+from users.models import Location, User
+from users.serializers import NameListField
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Serialization
+class UserLocationsTests(TestCase):
+    def test_user_without_locations(self):
+        user: User = create_user()
+
+        self.assertEqual(self.client.get(f"/user/{user.pk}/").json()["locations"], [])
+        self.assertEqual(self.client.get("/user/").json()["items"][0]["locations"], [])
+
+    def test_user_with_locations(self):
+        user: User = create_user()
+        create_user("other")
+        user.locations.set([Location.objects.create(name=name, lat=0, lng=0) for name in ["Москва", "Тула, центр"]])
+
+        self.assertEqual(sorted(self.client.get(f"/user/{user.pk}/").json()["locations"]), ["Москва", "Тула, центр"])
+        items: list[dict] = self.client.get("/user/").json()["items"]
+        self.assertEqual({item["username"]: sorted(item["locations"]) for item in items},
+                         {"user": ["Москва", "Тула, центр"], "other": []})
+
+    def test_array_from_postgresql(self):
+        self.assertEqual(NameListField().from_db_value(["Москва"], None, None), ["Москва"])
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Passwords
+class HashingPoolTests(SimpleTestCase):
+    @override_settings(PASSWORD_HASHING_TIMEOUT=0.01)
+    def test_timeout(self):
+        with self.assertRaises(TimeoutError):
+            passwords._run(time.sleep, 0.2)
+
+
+class UserLoginTests(TestCase):
+    def login(self, username: str, password: str):
+        return self.client.post("/user/login/", json.dumps({"username": username, "password": password}),
+                                content_type="application/json")
+
+    def test_login(self):
+        user: User = create_user(password=make_password("secret"))
+        response = self.login("user", "secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"id": user.id, "username": "user"})
+        self.assertEqual(self.login("user", "wrong").status_code, 401)
+
+    def test_plaintext_password_is_rehashed_on_login(self):
+        create_user(password="secret")
+        self.assertEqual(self.login("user", "secret").status_code, 200)
+        self.assertTrue(check_password("secret", User.objects.get().password))
+
+    def test_unknown_username_costs_a_hash(self):
+        with mock.patch("users.passwords.make_password", wraps=make_password) as hasher:
+            response = self.login("nobody", "secret")
+        self.assertEqual(response.status_code, 401)
+        hasher.assert_called_once_with("secret")
+
+    def test_busy_hashing_pool(self):
+        create_user(password=make_password("secret"))
+        body: str = json.dumps({"username": "new", "password": "secret", "first_name": "Имя", "last_name": "Фамилия",
+                                "role": "member", "age": 30, "locations": []})
+
+        with mock.patch("users.passwords._run", side_effect=TimeoutError):
+            responses = [
+                self.login("user", "secret"),
+                self.login("nobody", "secret"),
+                self.client.post("/user/create/", body, content_type="application/json"),
+                self.client.put(f"/user/{User.objects.get().pk}/update/", body, content_type="application/json"),
+            ]
+
+        for response in responses:
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(list(User.objects.values_list("username", flat=True)), ["user"])
+
+
+    def test_password_is_required(self):
+        user: User = create_user(password=make_password("secret"))
+        data: dict = {"username": "new", "first_name": "Имя", "last_name": "Фамилия", "role": "member", "age": 30,
+                      "locations": []}
+
+        for password in [None, "", 123]:
+            with self.subTest(password=password):
+                body: dict = data if password is None else {**data, "password": password}
+                response = self.client.post("/user/create/", json.dumps(body), content_type="application/json")
+                self.assertEqual(response.status_code, 400)
+                response = self.client.put(f"/user/{user.pk}/update/", json.dumps({**data, "password": password}),
+                                           content_type="application/json")
+                self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(list(User.objects.values_list("username", flat=True)), ["user"])
+        self.assertTrue(check_password("secret", User.objects.get().password))
+
+class HashPasswordsCommandTests(TestCase):
+    def test_plaintext_passwords_are_hashed(self):
+        create_user("plain", password="secret")
+        hashed: str = make_password("other")
+        create_user("hashed", password=hashed)
+
+        output = StringIO()
+        call_command("hash_passwords", batch_size=1, stdout=output)
+        self.assertIn("Hashed 1 passwords", output.getvalue())
+
+        self.assertTrue(check_password("secret", User.objects.get(username="plain").password))
+        self.assertEqual(User.objects.get(username="hashed").password, hashed)
+
+        call_command("hash_passwords", stdout=output)
+        self.assertIn("Hashed 0 passwords", output.getvalue())
@@ -1,12 +1,13 @@
 from django.urls import path
 
-from users.views import UserListView, UserCreateView, UserDetailView, UserUpdateView, UserDeleteView
+from users.views import UserListView, UserCreateView, UserDetailView, UserUpdateView, UserDeleteView, UserLoginView
 
 # ----------------------------------------------------------------------------------------------------------------------
 # Create user urls
 urlpatterns = [
     path('', UserListView.as_view()),
     path('create/', UserCreateView.as_view()),
+    path('login/', UserLoginView.as_view()),
     path('<int:pk>/', UserDetailView.as_view()),
     path('<int:pk>/update/', UserUpdateView.as_view()),
     path('<int:pk>/delete/', UserDeleteView.as_view()),
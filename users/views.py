@@ -1,47 +1,69 @@
 import json
 
+from django.conf import settings
 from django.core.paginator import Paginator
-from django.db.models import QuerySet, Count, Q
+from django.db import router, transaction
+from django.db.models import QuerySet
 from django.http import JsonResponse
-from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-
-from Homework_28_PD12 import settings
+from django.views.decorators.http import etag
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, View
+
+from Homework_28_PD12.projection import get_requested_fields
+from Homework_28_PD12.ratelimit import ratelimit, retry_later
+from Homework_28_PD12.versioning import bump_version, users_etag
+from ads.models import Ad
+from ads.purge import tombstone_ads
+from jobs.queue import enqueue
 from users.models import User, Location
+from users.passwords import hash_password, reject_unknown_user, verify_password
+from users.serializers import USER_DEFAULT_FIELDS, USER_FIELDS, load_user, serialize_user, user_queryset
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Overloaded password hashing pool
+def hashing_busy() -> JsonResponse:
+    # The pool didn't get to the password within PASSWORD_HASHING_TIMEOUT seconds
+    return retry_later(settings.PASSWORD_HASHING_RETRY_AFTER, status=503, error="Server is busy")
 
 
 # ----------------------------------------------------------------------------------------------------------------------
 # Users page (CBV)
+@method_decorator(etag(users_etag), name="get")
 class UserListView(ListView):
     model = User
 
+    def get_queryset(self) -> QuerySet:
+        """
+        Build the users queryset limited to the requested fields
+
+        :return: Projected queryset ordered by username
+        """
+        return user_queryset(super().get_queryset(), self.requested_fields).order_by("username")
+
     def get(self, request, *args, **kwargs) -> JsonResponse:
         """
         Handle a GET request to the UserView
         Returns a list of all User objects in the database as a JSON response
+        The ?fields= parameter limits the returned (and loaded) fields, e.g. ?fields=id,username
 
         :param request: The incoming request object
         :return: A JSON response with a list of dictionaries, where each dictionary represents a User object
         """
+        try:
+            self.requested_fields: list[str] = get_requested_fields(request, USER_FIELDS,
+                                                                    USER_DEFAULT_FIELDS + ["total_ads"])
+        except ValueError:
+            return JsonResponse({"error": "Wrong fields"}, status=400)
+
         super().get(request, *args, **kwargs)
-        users: QuerySet = self.object_list.annotate(total_ads=Count("ad", filter=Q(ad__is_published=True))) \
-            .prefetch_related("locations").order_by("username")
 
-        paginator = Paginator(users, settings.TOTAL_ON_PAGE)
+        paginator = Paginator(self.object_list, settings.TOTAL_ON_PAGE)
         page_number = request.GET.get("page")
         page_obj = paginator.get_page(page_number)
 
-        users_list: list[dict] = [{
-            "username": user.username,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "role": user.role,
-            "age": user.age,
-            "locations": list(map(str, user.locations.all())),
-            "total_ads": user.total_ads,
-        } for user in page_obj]
+        users_list: list[dict] = [serialize_user(user, self.requested_fields) for user in page_obj]
 
         return JsonResponse({
             "items": users_list,
@@ -50,30 +72,38 @@ class UserListView(ListView):
         }, safe=False, status=200)
 
 
+@method_decorator(etag(users_etag), name="get")
 class UserDetailView(DetailView):
     model = User
 
+    def get_queryset(self) -> QuerySet:
+        """
+        Build the user queryset limited to the requested fields
+
+        :return: Projected queryset
+        """
+        return user_queryset(super().get_queryset(), self.requested_fields)
+
     def get(self, request, *args, **kwargs) -> JsonResponse:
         """
         Retrieve a single User instance
+        The ?fields= parameter limits the returned (and loaded) fields
 
         :param request: The incoming request object
-        :return: JSON response with Category data
+        :return: JSON response with User data
         """
+        try:
+            self.requested_fields: list[str] = get_requested_fields(request, USER_FIELDS, USER_DEFAULT_FIELDS)
+        except ValueError:
+            return JsonResponse({"error": "Wrong fields"}, status=400)
+
         super().get(request, *args, **kwargs)
-        user: User = get_object_or_404(User, pk=kwargs["pk"])
 
-        return JsonResponse({
-            "username": user.username,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "role": user.role,
-            "age": user.age,
-            "locations": list(user.locations.all().values_list("name", flat=True))
-        }, status=200)
+        return JsonResponse(serialize_user(self.object, self.requested_fields), status=200)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
+@method_decorator(ratelimit("user_create"), name="post")
 class UserCreateView(CreateView):
     model = User
     fields: list[str] = ["username", "password", "first_name", "last_name", "role", "age", "locations"]
@@ -89,10 +119,13 @@ class UserCreateView(CreateView):
 
         try:
             user_data = json.loads(request.body)
+            password = user_data.get("password")
+            if not isinstance(password, str) or not password:
+                return JsonResponse({"error": "Invalid request"}, status=400)
 
             user: User = User.objects.create(
                 username=user_data.get("username"),
-                password=user_data.get("password"),
+                password=hash_password(password),
                 first_name=user_data.get("first_name"),
                 last_name=user_data.get("last_name"),
                 role=user_data.get("role"),
@@ -105,14 +138,9 @@ class UserCreateView(CreateView):
                 user.locations.add(location_obj)
             user.save()
 
-            return JsonResponse({
-                "username": user.username,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "role": user.role,
-                "age": user.age,
-                "locations": list(user.locations.all().values_list("name", flat=True))
-            }, status=200)
+            return JsonResponse(load_user(user.pk), status=200)
+        except TimeoutError:
+            return hashing_busy()
         except Exception:
             return JsonResponse({"error": "Invalid request"}, status=400)
 
@@ -135,7 +163,11 @@ class UserUpdateView(UpdateView):
             user_data = json.loads(request.body)
 
             self.object.username = user_data.get("username")
-            self.object.password = user_data.get("password")
+            if "password" in user_data:
+                password = user_data.get("password")
+                if not isinstance(password, str) or not password:
+                    return JsonResponse({"error": "Invalid request"}, status=400)
+                self.object.password = hash_password(password)
             self.object.first_name = user_data.get("first_name")
             self.object.last_name = user_data.get("last_name")
             self.object.age = user_data.get("age")
@@ -147,17 +179,12 @@ class UserUpdateView(UpdateView):
                     return JsonResponse({"error": "Location does not found"}, status=404)
                 self.object.locations.add(location_obj)
             self.object.save()
+        except TimeoutError:
+            return hashing_busy()
         except Exception:
             return JsonResponse({"error": "Invalid request"}, status=400)
 
-        return JsonResponse({
-            "username": self.object.username,
-            "first_name": self.object.first_name,
-            "last_name": self.object.last_name,
-            "role": self.object.role,
-            "age": self.object.age,
-            "locations": list(self.object.locations.all().values_list("name", flat=True))
-        }, status=200)
+        return JsonResponse(load_user(self.object.pk), status=200)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -167,10 +194,51 @@ class UserDeleteView(DeleteView):
 
     def delete(self, request, *args, **kwargs) -> JsonResponse:
         """
-        Handle a DELETE request to the UserView. Delete a User object in the database
+        Handle a DELETE request to the UserView. Mark a User object as deleted
+        Its ads are tombstoned in the same transaction and the rows removed later in batches
+        by the ads.purge_deleted job
 
         :param request: The incoming request object
         :return: A JSON response with a successful delete status
         """
-        super().delete(request, *args, **kwargs)
+        self.object = self.get_object()
+        using: str = router.db_for_write(Ad)
+        with transaction.atomic(using=using):
+            self.object.is_deleted = True
+            self.object.save(update_fields=["is_deleted", "updated_at"])
+            tombstone_ads(Ad.all_objects.filter(author=self.object), using)
+        bump_version("ads")
+        enqueue("ads.purge_deleted", dedupe=True)
         return JsonResponse({"status": "ok"})
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+@method_decorator(ratelimit("user_login"), name="post")
+class UserLoginView(View):
+
+    def post(self, request, *args, **kwargs) -> JsonResponse:
+        """
+        Handle a POST request to the UserLoginView. Check the username and the password of a User
+
+        :param request: The incoming request object
+        :return: A JSON response with the id and the username of the User or an error
+        """
+        try:
+            credentials = json.loads(request.body)
+            username, password = credentials["username"], credentials["password"]
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({"error": "Invalid request"}, status=400)
+
+        if not isinstance(password, str):
+            return JsonResponse({"error": "Invalid request"}, status=400)
+
+        user: User | None = User.objects.filter(username=username).first()
+        try:
+            is_correct: bool = verify_password(user, password) if user else reject_unknown_user(password)
+        except TimeoutError:
+            return hashing_busy()
+
+        if not is_correct:
+            return JsonResponse({"error": "Wrong username or password"}, status=401)
+
+        return JsonResponse({"id": user.id, "username": user.username}, status=200)